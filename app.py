@@ -1,22 +1,29 @@
 import streamlit as st
 import os
 import re
-from backend.store_data import process_and_store
-from backend.query_handler import generate_answer
-from flask import Flask, request, jsonify
+import json
+import time
+import uuid
+from backend import metrics
+from backend.jobs import get_job_queue
+from backend.db import get_document, delete_document
+from backend.registry import start_warm_up
+from backend.query_handler import generate_answer, stream_answer
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import logging
 from threading import Lock
 from email_validator import validate_email, EmailNotValidError
+from werkzeug.utils import secure_filename
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
 # Set up Flask app
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": ["http://localhost:8501"], "methods": ["GET", "POST", "DELETE"]}})
+CORS(app, resources={r"/api/*": {"origins": ["http://localhost:8501"], "methods": ["GET", "POST", "PUT", "DELETE"]}})
 limiter = Limiter(
     app,
     key_func=get_remote_address,
@@ -27,157 +34,188 @@ limiter = Limiter(
 users = []
 lock = Lock()
 
-# ================= PAGE SETTINGS =================
-st.set_page_config(
-    page_title="📚 Multimodal Knowledge Assistant",
-    page_icon="🧠",
-    layout="wide"
-)
-
-# ================= CUSTOM STYLES =================
-st.markdown("""
-    <style>
-    body {
-        background-color: #f8f9fa;
-        font-family: 'Segoe UI', sans-serif;
-    }
-    .main-title {
-        text-align: center;
-        font-size: 38px;
-        font-weight: 800;
-        color: #222;
-        margin-bottom: 5px;
-    }
-    .subtitle {
-        text-align: center;
-        font-size: 16px;
-        color: #555;
-        margin-bottom: 30px;
-    }
-    .section {
-        background-color: #ffffff;
-        border-radius: 12px;
-        padding: 30px;
-        box-shadow: 0 2px 12px rgba(0,0,0,0.08);
-        margin-bottom: 35px;
-    }
-    .stButton>button {
-        background-color: #0d6efd !important;
-        color: white !important;
-        font-weight: 600 !important;
-        border-radius: 8px !important;
-        border: none;
-        padding: 8px 20px !important;
-        transition: all 0.2s ease;
-    }
-    .stButton>button:hover {
-        background-color: #0b5ed7 !important;
-        transform: scale(1.03);
-    }
-    .footer {
-        text-align: center;
-        color: #777;
-        font-size: 14px;
-        margin-top: 40px;
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# ================= SIDEBAR =================
-st.sidebar.title("🧭 Navigation")
-menu = st.sidebar.radio("Go to", ["🏠 Home", "📂 Upload File", "🔍 Ask a Question", "ℹ️ About"])
-
-# ================= HOME =================
-if menu == "🏠 Home":
-    st.markdown("<div class='main-title'>🧠 Multimodal Knowledge Assistant</div>", unsafe_allow_html=True)
-    st.markdown("<div class='subtitle'>Upload any file — text, image, video, or audio — and ask intelligent questions about its content.</div>", unsafe_allow_html=True)
-
-    st.markdown("""
-    ### 💡 What You Can Do:
-    - 📄 Upload PDFs, Word, PowerPoint, or text files  
-    - 🖼️ Upload images (OCR coming soon)  
-    - 🎧 Upload audio or video files (speech extraction supported)  
-    - 🧠 Ask natural questions about your data  
-
-    ---
-    **Built with Gemini + Streamlit + MySQL**  
-    """)
-
-# ================= UPLOAD =================
-elif menu == "📂 Upload File":
-    st.markdown("<div class='main-title'>📤 Upload a File</div>", unsafe_allow_html=True)
-    st.markdown("<div class='subtitle'>Your data will be processed, extracted, and securely stored in the database.</div>", unsafe_allow_html=True)
-
-    st.markdown("<div class='section'>", unsafe_allow_html=True)
-
-    uploaded_file = st.file_uploader(
-        "Choose a document, image, audio, or video",
-        type=["pdf", "docx", "pptx", "txt", "md", "jpg", "png", "mp3", "mp4"]
+_EXTENSION = re.compile(r"^\.[A-Za-z0-9]+$")
+
+def upload_path(filename):
+    """
+    Unique path for an uploaded file: uploads/<uuid>/<sanitized name>. Jobs
+    read the file later, so a second upload with the same name must not
+    overwrite it; the directory keeps the original name for the document.
+    """
+    name = secure_filename(filename or "")
+    ext = os.path.splitext(filename or "")[1]
+    if _EXTENSION.match(ext) and not name.endswith(ext):
+        name = "upload" + ext  # e.g. a non-ASCII name sanitized down to its extension
+    directory = os.path.join("uploads", uuid.uuid4().hex)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name or "upload")
+
+def render_page():
+    """Render the Streamlit UI (runs on every Streamlit rerun of this script)."""
+    # ================= PAGE SETTINGS =================
+    st.set_page_config(
+        page_title="📚 Multimodal Knowledge Assistant",
+        page_icon="🧠",
+        layout="wide"
     )
 
-    if uploaded_file:
-        os.makedirs("uploads", exist_ok=True)
-        file_path = os.path.join("uploads", uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.read())
-
-        st.success(f"✅ `{uploaded_file.name}` uploaded successfully!")
-
-        with st.spinner("Processing and storing your file..."):
-            doc_id, text = process_and_store(file_path)
-
-        if text:
-            st.success("✅ File processed and stored successfully!")
-            st.caption(f"Document ID: `{doc_id}`")
-
-            with st.expander("📄 View Extracted Text"):
-                st.text_area("Extracted Text (Preview)", text[:3000], height=300)
-        else:
-            st.error("❌ Failed to process this file. Please check backend logs.")
-    st.markdown("</div>", unsafe_allow_html=True)
-
-# ================= ASK QUESTION =================
-elif menu == "🔍 Ask a Question":
-    st.markdown("<div class='main-title'>🔍 Ask a Question</div>", unsafe_allow_html=True)
-    st.markdown("<div class='subtitle'>Query your uploaded knowledge base using natural language.</div>", unsafe_allow_html=True)
-
-    st.markdown("<div class='section'>", unsafe_allow_html=True)
-    query = st.text_input("Enter your question below:")
-
-    if st.button("Get Answer"):
-        if not query.strip():
-            st.warning("⚠️ Please enter a valid question.")
-        else:
-            with st.spinner("Searching and generating answer..."):
-                answer = generate_answer(query)
-
-            st.markdown("### 🧠 Gemini’s Answer:")
-            st.info(answer)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-# ================= ABOUT =================
-elif menu == "ℹ️ About":
-    st.markdown("<div class='main-title'>ℹ️ About</div>", unsafe_allow_html=True)
+    # ================= CUSTOM STYLES =================
     st.markdown("""
-    ### 🤖 Multimodal Knowledge Assistant
-    This intelligent assistant can process multiple data formats:
-    - Text documents (`pdf`, `docx`, `pptx`, `txt`)
-    - Images (`jpg`, `png`)
-    - Audio/Video (`mp3`, `mp4`)
-
-    **Key Features:**
-    - Converts uploaded files into searchable knowledge
-    - Embeds data into MySQL for efficient retrieval
-    - Answers natural language queries using Gemini API
-
-    ---
-    **Developer:** Dasari Santhosh  
-    **Backend:** Python, Streamlit, MySQL, Gemini API  
-    **Version:** 1.0.0  
-    """)
-
-# ================= FOOTER =================
-st.markdown("<div class='footer'>© 2025 Multimodal Knowledge Assistant</div>", unsafe_allow_html=True)
+        <style>
+        body {
+            background-color: #f8f9fa;
+            font-family: 'Segoe UI', sans-serif;
+        }
+        .main-title {
+            text-align: center;
+            font-size: 38px;
+            font-weight: 800;
+            color: #222;
+            margin-bottom: 5px;
+        }
+        .subtitle {
+            text-align: center;
+            font-size: 16px;
+            color: #555;
+            margin-bottom: 30px;
+        }
+        .section {
+            background-color: #ffffff;
+            border-radius: 12px;
+            padding: 30px;
+            box-shadow: 0 2px 12px rgba(0,0,0,0.08);
+            margin-bottom: 35px;
+        }
+        .stButton>button {
+            background-color: #0d6efd !important;
+            color: white !important;
+            font-weight: 600 !important;
+            border-radius: 8px !important;
+            border: none;
+            padding: 8px 20px !important;
+            transition: all 0.2s ease;
+        }
+        .stButton>button:hover {
+            background-color: #0b5ed7 !important;
+            transform: scale(1.03);
+        }
+        .footer {
+            text-align: center;
+            color: #777;
+            font-size: 14px;
+            margin-top: 40px;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
+    # ================= SIDEBAR =================
+    st.sidebar.title("🧭 Navigation")
+    menu = st.sidebar.radio("Go to", ["🏠 Home", "📂 Upload File", "🔍 Ask a Question", "ℹ️ About"])
+
+    # ================= HOME =================
+    if menu == "🏠 Home":
+        st.markdown("<div class='main-title'>🧠 Multimodal Knowledge Assistant</div>", unsafe_allow_html=True)
+        st.markdown("<div class='subtitle'>Upload any file — text, image, video, or audio — and ask intelligent questions about its content.</div>", unsafe_allow_html=True)
+
+        st.markdown("""
+        ### 💡 What You Can Do:
+        - 📄 Upload PDFs, Word, PowerPoint, or text files  
+        - 🖼️ Upload images (text extracted with OCR)  
+        - 🎧 Upload audio or video files (speech extraction supported)  
+        - 🧠 Ask natural questions about your data  
+
+        ---
+        **Built with Gemini + Streamlit + MySQL**  
+        """)
+
+    # ================= UPLOAD =================
+    elif menu == "📂 Upload File":
+        st.markdown("<div class='main-title'>📤 Upload a File</div>", unsafe_allow_html=True)
+        st.markdown("<div class='subtitle'>Your data will be processed, extracted, and securely stored in the database.</div>", unsafe_allow_html=True)
+
+        st.markdown("<div class='section'>", unsafe_allow_html=True)
+
+        uploaded_file = st.file_uploader(
+            "Choose a document, image, audio, or video",
+            type=["pdf", "docx", "pptx", "txt", "md", "jpg", "png", "mp3", "mp4"]
+        )
+
+        if uploaded_file:
+            file_path = upload_path(uploaded_file.name)
+            with open(file_path, "wb") as f:
+                f.write(uploaded_file.read())
+
+            st.success(f"✅ `{uploaded_file.name}` uploaded successfully!")
+
+            queue = get_job_queue()
+            job_id = queue.submit(file_path)
+            status = st.empty()
+            with st.spinner("Processing and storing your file..."):
+                job = queue.get(job_id)
+                while job["status"] in ("queued", "running"):
+                    counts = ", ".join(f"{k} {v}" for k, v in job["progress"].items())
+                    status.caption(f"Job `{job_id}` — {job['stage']} {counts}")
+                    time.sleep(1)
+                    job = queue.get(job_id)
+            status.empty()
+
+            if job["status"] == "done":
+                st.success("✅ File processed and stored successfully!")
+                st.caption(f"Document ID: `{job['doc_id']}`")
+
+                with st.expander("📄 View Extracted Text"):
+                    st.text_area("Extracted Text (Preview)", (job["preview"] or "")[:3000], height=300)
+            else:
+                st.error("❌ Failed to process this file. Please check backend logs.")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    # ================= ASK QUESTION =================
+    elif menu == "🔍 Ask a Question":
+        st.markdown("<div class='main-title'>🔍 Ask a Question</div>", unsafe_allow_html=True)
+        st.markdown("<div class='subtitle'>Query your uploaded knowledge base using natural language.</div>", unsafe_allow_html=True)
+
+        st.markdown("<div class='section'>", unsafe_allow_html=True)
+        query = st.text_input("Enter your question below:")
+        source_filter = st.selectbox("Search in", ["All sources", "text", "audio", "video", "image"])
+
+        if st.button("Get Answer"):
+            if not query.strip():
+                st.warning("⚠️ Please enter a valid question.")
+            else:
+                st.markdown("### 🧠 Gemini’s Answer:")
+                timings = {}
+                with st.spinner("Searching and generating answer..."):
+                    st.write_stream(stream_answer(
+                        query, timings=timings,
+                        source_type=None if source_filter == "All sources" else source_filter,
+                    ))
+                if "ttft_ms" in timings:
+                    st.caption(f"⏱️ First token in {timings['ttft_ms']:.0f} ms · total {timings.get('total_ms', 0):.0f} ms")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    # ================= ABOUT =================
+    elif menu == "ℹ️ About":
+        st.markdown("<div class='main-title'>ℹ️ About</div>", unsafe_allow_html=True)
+        st.markdown("""
+        ### 🤖 Multimodal Knowledge Assistant
+        This intelligent assistant can process multiple data formats:
+        - Text documents (`pdf`, `docx`, `pptx`, `txt`)
+        - Images (`jpg`, `png`)
+        - Audio/Video (`mp3`, `mp4`)
+
+        **Key Features:**
+        - Converts uploaded files into searchable knowledge
+        - Embeds data into MySQL for efficient retrieval
+        - Answers natural language queries using Gemini API
+
+        ---
+        **Developer:** Dasari Santhosh  
+        **Backend:** Python, Streamlit, MySQL, Gemini API  
+        **Version:** 1.0.0  
+        """)
+
+    # ================= FOOTER =================
+    st.markdown("<div class='footer'>© 2025 Multimodal Knowledge Assistant</div>", unsafe_allow_html=True)
 
 # API Endpoints
 @app.route('/api/upload', methods=['POST'])
@@ -190,14 +228,80 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
         if file:
-            os.makedirs("uploads", exist_ok=True)
-            file_path = os.path.join("uploads", file.filename)
+            file_path = upload_path(file.filename)
             file.save(file_path)
-            doc_id, text = process_and_store(file_path)
-            if text:
-                return jsonify({'document_id': doc_id, 'extracted_text': text[:3000]}), 200
-            else:
-                return jsonify({'error': 'Failed to process file'}), 500
+            job_id = get_job_queue().submit(file_path)
+            return jsonify({'job_id': job_id, 'status_url': f'/api/jobs/{job_id}'}), 202
+
+@app.route('/api/documents/<doc_id>', methods=['GET'])
+@limiter.limit("120 per minute")
+def document_info(doc_id):
+    document = get_document(doc_id)
+    if document is None:
+        return jsonify({'error': 'Document not found'}), 404
+    return jsonify(document), 200
+
+@app.route('/api/documents/<doc_id>', methods=['PUT'])
+@limiter.limit("10 per minute")
+def replace_document(doc_id):
+    if get_document(doc_id) is None:
+        return jsonify({'error': 'Document not found'}), 404
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part'}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    file_path = upload_path(file.filename)
+    file.save(file_path)
+    # Only new or changed chunks are re-embedded (store_data.update_document)
+    job_id = get_job_queue().submit(file_path, doc_id=doc_id)
+    return jsonify({'job_id': job_id, 'document_id': doc_id, 'status_url': f'/api/jobs/{job_id}'}), 202
+
+@app.route('/api/documents/<doc_id>', methods=['DELETE'])
+@limiter.limit("10 per minute")
+def remove_document(doc_id):
+    if get_document(doc_id) is None:
+        return jsonify({'error': 'Document not found'}), 404
+    removed = delete_document(doc_id)
+    if removed is None:
+        return jsonify({'error': 'Failed to delete document'}), 500
+    return jsonify({'message': 'Document deleted successfully', 'document_id': doc_id, 'chunks_removed': removed}), 200
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@limiter.limit("120 per minute")
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'document_id': job['doc_id'],
+        'extracted_text': (job['preview'] or '')[:3000] if job['status'] == 'done' else None,
+        'error': job['error'],
+    }), 200
+
+def sse_answer(query, filters, explain=False):
+    """
+    Server-Sent Events stream: one `data` event per answer piece, then a `done`
+    event with timings (and the stage breakdown under `explain` if asked).
+    """
+    timings = {}
+    with metrics.trace("ask_stream") as trace:
+        for piece in stream_answer(query, timings=timings, **filters):
+            yield f"data: {json.dumps({'text': piece})}\n\n"
+    if explain:
+        timings['explain'] = trace.breakdown()
+    yield f"event: done\ndata: {json.dumps(timings)}\n\n"
+
+def ask_stream_response(query, filters, explain=False):
+    return Response(
+        stream_with_context(sse_answer(query, filters, explain)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 @app.route('/api/ask', methods=['POST'])
 @limiter.limit("10 per minute")
@@ -206,8 +310,31 @@ def ask_question():
         query = request.json.get('query')
         if not query:
             return jsonify({'error': 'No query provided'}), 400
-        answer = generate_answer(query)
-        return jsonify({'answer': answer}), 200
+        filters = {key: request.json.get(key) for key in ('document_ids', 'source_type', 'uploaded_after')}
+        explain = request.args.get('explain') == '1'
+        if request.json.get('stream'):
+            return ask_stream_response(query, filters, explain)
+        with metrics.trace("ask") as trace:
+            answer = generate_answer(query, **filters)
+        body = {'answer': answer}
+        if explain:
+            body['explain'] = trace.breakdown()
+        return jsonify(body), 200
+
+@app.route('/api/ask/stream', methods=['POST'])
+@limiter.limit("10 per minute")
+def ask_question_stream():
+    query = (request.json or {}).get('query')
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    filters = {key: request.json.get(key) for key in ('document_ids', 'source_type', 'uploaded_after')}
+    return ask_stream_response(query, filters, request.args.get('explain') == '1')
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def prometheus_metrics():
+    """Stage latency histograms and pipeline counters in Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/users', methods=['POST'])
 @limiter.limit("10 per minute")
@@ -251,5 +378,10 @@ def not_found(e):
 def internal_server_error(e):
     return jsonify({'error': 'Internal server error'}), 500
 
+# Entry point only: worker processes spawned by the backend (e.g. Whisper
+# transcription) import this module as __mp_main__ and must not re-run it
 if __name__ == '__main__':
+    # Optionally preload models/indexes in the background (WARMUP=retriever,genai,...)
+    start_warm_up()
+    render_page()
     app.run(debug=False)
\ No newline at end of file
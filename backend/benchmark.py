@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+
+# Hot paths measured here:
+#   ingest   store_data.process_and_store      (extract → chunk → embed → store, per file)
+#   embed    generate_embeddings.create_embeddings (chunk → embed → store, per text)
+#   queries  search_engine.search_similar_chunks, query_engine.find_most_relevant_chunks,
+#            query_handler.generate_answer
+#
+# Everything runs offline: backend modules are imported only after
+# offline_environment() has pointed them at a SQLite file, the fake embedder
+# and the fake generator, so no MySQL server or Gemini key is needed.
+
+# Synthetic corpus defaults
+BENCH_DOCS = 50
+BENCH_CHUNKS = 20
+BENCH_DIM = 384
+BENCH_QUERIES = 200
+BENCH_SEED = 42
+
+_SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vor", "shi", "dul", "pe", "zan", "qu", "bel", "nor", "tri", "ex", "on"]
+
+
+def offline_environment(workdir, dim=BENCH_DIM):
+    """
+    Environment for an offline run: SQLite database in `workdir`, fake
+    embedder and generator (no simulated latency), no index persistence and
+    no warm-up. Must be applied before any backend module is imported.
+    """
+    return {
+        "DB_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "bench.sqlite3"),
+        "EMBED_PROVIDER": "fake",
+        "FAKE_EMBED_DIM": str(dim),
+        "FAKE_EMBED_MS": "0",
+        "GENERATION_MODEL": "fake",
+        "FAKE_FIRST_TOKEN_MS": "0",
+        "FAKE_TOKEN_MS": "0",
+        "VECTOR_INDEX_PATH": "",
+        "WARMUP": "",
+    }
+
+
+class SyntheticCorpus:
+    """
+    Deterministic documents of `chunks` sections each. A section is a short
+    heading followed by sentences filling about 3/4 of the chunk token budget,
+    so the chunker produces roughly one chunk per section. Every section also
+    carries an identifier (e.g. "ERR-3-17") for keyword queries.
+    """
+
+    def __init__(self, docs=BENCH_DOCS, chunks=BENCH_CHUNKS, seed=BENCH_SEED, vocabulary=5000):
+        self.docs = docs
+        self.chunks = chunks
+        self.seed = seed
+        rng = random.Random(seed)
+        words = set()
+        while len(words) < vocabulary:
+            words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+        self.vocabulary = sorted(words)
+
+    def _sentence(self, rng):
+        words = rng.choices(self.vocabulary, k=rng.randint(8, 16))
+        return " ".join(words).capitalize() + "."
+
+    def section(self, doc, index, rng, target_tokens):
+        from backend.chunking import count_tokens
+
+        sentences = [f"Reference ERR-{doc}-{index} applies here."]
+        while count_tokens(" ".join(sentences)) < target_tokens:
+            sentences.append(self._sentence(rng))
+        return f"Section {index} of document {doc}\n\n" + " ".join(sentences) + "\n"
+
+    def document(self, doc):
+        """Text of document number `doc` (the same for a given seed)."""
+        from backend.chunking import CHUNK_TOKENS
+        from backend.generate_embeddings import LOCAL_CHUNK_TOKENS
+
+        rng = random.Random(f"{self.seed}-{doc}")
+        target = int(min(CHUNK_TOKENS, LOCAL_CHUNK_TOKENS) * 0.75)
+        return "\n".join(self.section(doc, i, rng, target) for i in range(self.chunks))
+
+    def write(self, directory, first=0):
+        """Write documents first..first+docs-1 as .txt files; returns their paths."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for doc in range(first, first + self.docs):
+            path = os.path.join(directory, f"doc_{doc:05d}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.document(doc))
+            paths.append(path)
+        return paths
+
+    def queries(self, count, texts):
+        """`count` distinct queries: words sampled from chunk texts, one in five an identifier."""
+        rng = random.Random(f"{self.seed}-queries")
+        queries = []
+        for n in range(count):
+            if n % 5 == 4:
+                queries.append(f"ERR-{rng.randrange(self.docs)}-{rng.randrange(self.chunks)}")
+            else:
+                words = rng.choice(texts).split()
+                start = rng.randrange(max(1, len(words) - 6))
+                queries.append(f"{' '.join(words[start:start + 6])} {n}")
+        return queries
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def latency_summary(samples_ms):
+    """p50/p95/p99/mean/max of a list of latencies in milliseconds."""
+    import numpy as np
+
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if not len(samples):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(len(samples)),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def bench_ingest(paths):
+    """process_and_store() every file; returns throughput figures."""
+    from backend.store_data import process_and_store
+    from backend.retriever import get_retriever
+
+    retriever = get_retriever()
+    before = len(retriever)
+    started = time.perf_counter()
+    stored = sum(1 for path in paths if process_and_store(path)[0])
+    seconds = time.perf_counter() - started
+    chunks = len(retriever) - before
+    return {
+        "documents": stored,
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "docs_per_sec": round(stored / seconds, 2) if seconds else None,
+        "chunks_per_sec": round(chunks / seconds, 1) if seconds else None,
+    }
+
+
+def bench_embed(corpus, first):
+    """create_embeddings() on fresh document texts (no embedding cache hits)."""
+    from backend.generate_embeddings import create_embeddings
+
+    texts = [corpus.document(doc) for doc in range(first, first + corpus.docs)]
+    started = time.perf_counter()
+    chunks = sum(create_embeddings(f"bench-embed-{i}", text) for i, text in enumerate(texts))
+    seconds = time.perf_counter() - started
+    return {
+        "documents": len(texts),
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "chunks_per_sec": round(chunks / seconds, 1) if seconds else None,
+    }
+
+
+def bench_queries(queries, top_k=5):
+    """Latency of each query hot path over the same query list."""
+    from backend.search_engine import search_similar_chunks
+    from backend.query_engine import generate_query_embedding, find_most_relevant_chunks
+    from backend.query_handler import generate_answer
+    from backend.query_cache import query_embedding_cache, answer_cache
+
+    def find_chunks(query):
+        return find_most_relevant_chunks(generate_query_embedding(query), top_k=top_k)
+
+    paths = {
+        "search_similar_chunks": lambda q: search_similar_chunks(q, top_k=top_k),
+        "find_most_relevant_chunks": find_chunks,
+        "generate_answer": generate_answer,
+    }
+    results = {}
+    for name, fn in paths.items():
+        # Each path starts cold so a query is never served by another path's cache entry
+        query_embedding_cache.clear()
+        answer_cache.clear()
+        results[name] = latency_summary([_timed(fn, query)[1] for query in queries])
+    return results
+
+
+def run(docs=BENCH_DOCS, chunks=BENCH_CHUNKS, dim=BENCH_DIM, queries=BENCH_QUERIES, seed=BENCH_SEED,
+        embed_docs=None, workdir=None, quiet=True):
+    """
+    Build a synthetic corpus, ingest it and time the query paths. Returns the
+    JSON-ready report. Backend modules are imported here, after the offline
+    environment is in place; an already-imported backend keeps its settings.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="mka-bench-")
+    os.environ.update(offline_environment(workdir, dim))
+    if embed_docs is None:
+        embed_docs = max(1, docs // 4)
+
+    corpus = SyntheticCorpus(docs, chunks, seed)
+    report = {
+        "config": {"docs": docs, "chunks_per_doc": chunks, "dim": dim, "queries": queries, "seed": seed,
+                   "embed_docs": embed_docs, "workdir": workdir},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+    }
+
+    sink = open(os.devnull, "w") if quiet else None
+    with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+        import numpy as np
+        from backend.retriever import get_retriever, RETRIEVER_BACKEND
+        from backend.search_engine import SEARCH_MODE
+
+        report["environment"].update(numpy=np.__version__, retriever=RETRIEVER_BACKEND, search_mode=SEARCH_MODE)
+        paths = corpus.write(os.path.join(workdir, "corpus"))
+        report["rss_mb_after_setup"] = peak_rss_mb()
+
+        report["ingest"] = bench_ingest(paths)
+        report["embed"] = bench_embed(SyntheticCorpus(embed_docs, chunks, seed), first=docs)
+        report["rss_mb_after_ingest"] = peak_rss_mb()
+
+        texts = get_retriever().index.texts
+        report["queries"] = bench_queries(corpus.queries(queries, texts)) if texts else {}
+    if sink:
+        sink.close()
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+# Metrics compared against a baseline and whether higher is better
+COMPARED_METRICS = {
+    ("ingest", "chunks_per_sec"): True,
+    ("embed", "chunks_per_sec"): True,
+    ("peak_rss_mb",): False,
+}
+
+
+def compare(report, baseline, tolerance=0.10):
+    """
+    Relative change of each metric against a baseline report. A metric that
+    got worse by more than `tolerance` is listed in "regressions".
+    """
+    metrics = dict(COMPARED_METRICS)
+    for name in report.get("queries", {}):
+        for stat in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[("queries", name, stat)] = False
+
+    changes, regressions = {}, []
+    for path, higher_is_better in metrics.items():
+        current, previous = report, baseline
+        for key in path:
+            current = current.get(key) if isinstance(current, dict) else None
+            previous = previous.get(key) if isinstance(previous, dict) else None
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous
+        name = ".".join(path)
+        changes[name] = round(change, 4)
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(name)
+    return {"changes": changes, "regressions": regressions, "tolerance": tolerance}
+
+
+if __name__ == "__main__":
+    # Offline performance baseline: python -m backend.benchmark --output bench.json [--baseline old.json]
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and query hot paths on a synthetic corpus.")
+    parser.add_argument("--docs", type=int, default=BENCH_DOCS, help="Documents ingested with process_and_store")
+    parser.add_argument("--chunks", type=int, default=BENCH_CHUNKS, help="Sections (≈ chunks) per document")
+    parser.add_argument("--dim", type=int, default=BENCH_DIM, help="Fake embedding dimension")
+    parser.add_argument("--queries", type=int, default=BENCH_QUERIES, help="Queries timed per query path")
+    parser.add_argument("--embed-docs", type=int, default=None, help="Extra documents for create_embeddings (default docs/4)")
+    parser.add_argument("--seed", type=int, default=BENCH_SEED)
+    parser.add_argument("--workdir", default=None, help="Directory for the corpus and SQLite file (default: temp dir)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression (default 0.10)")
+    parser.add_argument("--verbose", action="store_true", help="Show the backend's own log output")
+    args = parser.parse_args()
+
+    report = run(args.docs, args.chunks, args.dim, args.queries, args.seed, args.embed_docs, args.workdir,
+                 quiet=not args.verbose)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"✅ Benchmark report written to {args.output}")
+    else:
+        print(output)
+    sys.exit(1 if report.get("comparison", {}).get("regressions") else 0)
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from backend.extract_text import extract_segments
+from backend.embedding_cache import file_hash
+
+# File types handled by the bulk path (audio/video go through the upload queue)
+BULK_EXTENSIONS = {".pdf", ".docx", ".pptx", ".txt", ".md", ".png", ".jpg", ".jpeg"}
+
+DEFAULT_CHECKPOINT = "bulk_ingest.checkpoint.jsonl"
+
+
+def iter_input_files(root=None, manifest=None):
+    """Yield file paths from a directory tree and/or a manifest (one path per line)."""
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                path = line.strip()
+                if path and not path.startswith("#"):
+                    yield path
+    if root:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in BULK_EXTENSIONS:
+                    yield os.path.join(dirpath, name)
+
+
+def load_checkpoint(checkpoint_path):
+    """Return the set of paths already finished according to the checkpoint file."""
+    finished = set()
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line after a crash
+                if entry.get("status") in ("stored", "duplicate", "empty"):
+                    finished.add(entry["path"])
+    return finished
+
+
+def _extract_worker(path):
+    """Process-pool task: hash and extract one file. Returns a picklable dict."""
+    try:
+        size = os.path.getsize(path)
+        digest = file_hash(path)
+        segments = extract_segments(path)
+        return {"path": path, "size": size, "hash": digest, "segments": segments, "error": None}
+    except Exception as e:
+        return {"path": path, "size": 0, "hash": None, "segments": None, "error": str(e)}
+
+
+def _extracted(paths, workers):
+    """Run extraction across a process pool, keeping a bounded number of files in flight."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(_extract_worker, path))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _store(result):
+    """Embed-and-store stage for one extracted file. Returns (status, doc_id)."""
+    # Imported here so spawned extraction workers skip the embedding stack
+    from backend.db import insert_document, find_document_by_hash, set_document_hash, delete_document
+    from backend.generate_embeddings import create_embeddings
+    from backend.store_data import document_metadata
+
+    existing = find_document_by_hash(result["hash"], preview_chars=1)
+    if existing:
+        return "duplicate", existing[0]
+    segments = result["segments"] or []
+    text = "\n".join(segment for segment, _ in segments).strip()
+    if not text:
+        return "empty", None
+
+    doc_id = str(uuid.uuid4())
+    insert_document(doc_id, text, metadata=document_metadata(result["path"]))
+    try:
+        inserted = create_embeddings(doc_id, segments)
+    except Exception:
+        delete_document(doc_id)
+        raise
+    if not inserted:
+        # Don't leave a document row without chunks behind for the retry to duplicate
+        delete_document(doc_id)
+        return "failed", None
+    set_document_hash(doc_id, result["hash"])
+    return "stored", doc_id
+
+
+def bulk_ingest(paths, checkpoint_path=DEFAULT_CHECKPOINT, workers=None, report_every=25):
+    """
+    Ingest many files: extraction runs in a process pool sized to the CPU
+    count, and a single stage in this process embeds and stores the results.
+
+    Every finished file is appended to a JSONL checkpoint, so a re-run after a
+    crash skips files that were already stored.
+    Returns a stats dict with counts and files/sec, MB/sec throughput.
+    """
+    workers = workers or os.cpu_count() or 1
+    finished = load_checkpoint(checkpoint_path)
+    todo = (p for p in paths if p not in finished)
+
+    stats = {"stored": 0, "duplicate": 0, "empty": 0, "failed": 0, "skipped": len(finished), "bytes": 0}
+    started = time.perf_counter()
+    processed = 0
+
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    try:
+        for result in _extracted(todo, workers):
+            if result["error"]:
+                print(f"❌ Extraction failed for {result['path']}: {result['error']}")
+                status, doc_id = "failed", None
+            else:
+                try:
+                    status, doc_id = _store(result)
+                except Exception as e:
+                    print(f"❌ Storing {result['path']} failed: {e}")
+                    status, doc_id = "failed", None
+
+            stats[status] += 1
+            stats["bytes"] += result["size"]
+            processed += 1
+            if checkpoint:
+                checkpoint.write(json.dumps({
+                    "path": result["path"], "hash": result["hash"],
+                    "doc_id": doc_id, "status": status,
+                }) + "\n")
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+
+            if processed % report_every == 0:
+                _print_throughput(processed, stats["bytes"], time.perf_counter() - started)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    stats.update(_throughput(processed, stats["bytes"], elapsed))
+    _print_throughput(processed, stats["bytes"], elapsed)
+    print(f"✅ Bulk ingest finished: {json.dumps(stats)}")
+    return stats
+
+
+def _throughput(files, size_bytes, elapsed):
+    elapsed = max(elapsed, 1e-9)
+    return {
+        "files": files,
+        "seconds": round(elapsed, 3),
+        "files_per_sec": round(files / elapsed, 3),
+        "mb_per_sec": round(size_bytes / (1024 * 1024) / elapsed, 3),
+    }
+
+
+def _print_throughput(files, size_bytes, elapsed):
+    t = _throughput(files, size_bytes, elapsed)
+    print(f"📈 {files} files in {t['seconds']}s — {t['files_per_sec']} files/sec, {t['mb_per_sec']} MB/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory tree or manifest of documents.")
+    parser.add_argument("root", nargs="?", help="Directory to walk for pdf/docx/pptx/txt/md/image files")
+    parser.add_argument("--manifest", help="Text file listing one path per line")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="JSONL checkpoint for resuming")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    args = parser.parse_args()
+    if not args.root and not args.manifest:
+        parser.error("give a directory and/or --manifest")
+    bulk_ingest(iter_input_files(args.root, args.manifest), args.checkpoint, args.workers)
@@ -0,0 +1,191 @@
+import os
+import re
+import backend.config  # noqa: F401  (loads .env)
+
+# Token budget per chunk and tokens repeated from the end of the previous chunk
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+# tiktoken encoding used for counting; a regex estimate is used if tiktoken is missing
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "cl100k_base")
+
+# Sentence ends: terminal punctuation (optionally followed by a closing quote/bracket) then space
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_TOKEN_ESTIMATE = re.compile(r"\w+|[^\w\s]")
+_HEADING_MAX_WORDS = 12
+# Numbered section titles: "2", "2.3", "IV.", "Chapter 3", "Section 4 ..."
+_NUMBERED_HEADING = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.|(?:chapter|section|part|appendix)\s+\w+)(?:\s|$)", re.I)
+
+# Segment meta keys that locate a chunk in its source, in order of preference
+_LOCATION_KEYS = ("page", "slide", "paragraph", "line")
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken when installed, else estimate from words and punctuation."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(CHUNK_TOKENIZER)
+        except Exception:
+            _encoding = False
+            print("⚠️ tiktoken not available, estimating chunk token counts")
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(_TOKEN_ESTIMATE.findall(text))
+
+
+def _is_heading(line, meta):
+    """
+    A short line without closing punctuation that is marked as a heading by
+    its source (DOCX heading style) or numbered like a section title.
+    Short lines alone (list items, table rows) are not headings.
+    """
+    return (
+        len(line.split()) <= _HEADING_MAX_WORDS
+        and not line.endswith((".", "!", "?", ",", ";", ":"))
+        and (meta.get("heading") or _NUMBERED_HEADING.match(line) is not None)
+    )
+
+
+def _split_heading(paragraph, meta):
+    """
+    Split a heading off the start of a paragraph: (heading or None, rest).
+    A markdown "#" line is a heading even when text follows it on the next
+    line; otherwise only a paragraph that is a single heading line is.
+    """
+    line, _, rest = paragraph.partition("\n")
+    if line.startswith("#"):
+        return line.lstrip("#").strip(), rest.strip()
+    if not rest and _is_heading(line, meta):
+        return line, ""
+    return None, paragraph
+
+
+def _split_long(sentence, max_tokens):
+    """Split a sentence longer than the budget into word runs that fit."""
+    piece, piece_tokens = [], 0
+    for word in sentence.split():
+        tokens = count_tokens(" " + word)
+        if piece and piece_tokens + tokens > max_tokens:
+            yield " ".join(piece), piece_tokens
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += tokens
+    if piece:
+        yield " ".join(piece), piece_tokens
+
+
+def iter_units(segments, max_tokens=CHUNK_TOKENS):
+    """
+    Break (text, meta) segments into sentence units:
+    (text, tokens, meta, is_heading, starts_paragraph).
+    Line breaks inside a paragraph (PDF line wrapping) are joined first.
+    Only a single line can be a heading, and anything longer than the
+    budget is split by sentence (then by words). Transcript segments
+    (timestamped) are never treated as headings.
+    """
+    for segment in segments:
+        text, meta = segment if isinstance(segment, tuple) else (segment, {})
+        if not text:
+            continue
+        for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if "start" not in meta:
+                heading, rest = _split_heading(paragraph, meta)
+                heading_tokens = count_tokens(heading) if heading else 0
+                if heading and heading_tokens <= max_tokens:
+                    yield heading, heading_tokens, meta, True, True
+                    paragraph = rest
+                    if not paragraph:
+                        continue
+            first = "start" not in meta  # transcript segments run on
+            for sentence in _SENTENCE_END.split(" ".join(paragraph.split())):
+                if not sentence:
+                    continue
+                tokens = count_tokens(sentence)
+                pieces = [(sentence, tokens)] if tokens <= max_tokens else _split_long(sentence, max_tokens)
+                for piece, piece_tokens in pieces:
+                    yield piece, piece_tokens, meta, False, first
+                    first = False
+
+
+def source_span(metas):
+    """
+    Merge the segment metas of a chunk into one location:
+    {"source_unit": "page"|"slide"|...|"time", "source_start": x, "source_end": y}.
+    """
+    for key in _LOCATION_KEYS:
+        values = [m[key] for m in metas if key in m]
+        if values:
+            return {"source_unit": key, "source_start": min(values), "source_end": max(values)}
+    starts = [m["start"] for m in metas if "start" in m]
+    if starts:
+        ends = [m.get("end", m["start"]) for m in metas if "start" in m]
+        return {"source_unit": "time", "source_start": min(starts), "source_end": max(ends)}
+    return {}
+
+
+def chunk_segments(segments, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    """
+    Split a stream of (text, meta) segments into token-budgeted chunks.
+
+    Chunks end on sentence boundaries, a heading starts a new chunk, and the
+    last `overlap` tokens' worth of sentences are repeated at the start of the
+    next chunk within a section. Yields (text, meta) where meta holds the
+    chunk's source span (see source_span) and its token_count.
+    """
+    overlap = min(overlap, max_tokens // 2)
+    window, window_tokens = [], 0
+
+    def emit():
+        text = ""
+        for unit_text, _, _, is_heading, starts_paragraph in window:
+            sep = "\n" if starts_paragraph or is_heading else " "
+            text = f"{text}{sep}{unit_text}" if text else unit_text
+        meta = source_span([unit[2] for unit in window])
+        meta["token_count"] = window_tokens
+        return text, meta
+
+    def carry():
+        kept, kept_tokens = [], 0
+        for unit in reversed(window):
+            if kept_tokens + unit[1] > overlap:
+                break
+            kept.insert(0, unit)
+            kept_tokens += unit[1]
+        return kept, kept_tokens
+
+    for unit in iter_units(segments, max_tokens):
+        tokens, is_heading = unit[1], unit[3]
+        if window and is_heading and window_tokens >= max_tokens // 4:
+            # New section: close the current chunk without overlap
+            yield emit()
+            window, window_tokens = [], 0
+        elif window and window_tokens + tokens > max_tokens:
+            heading = window.pop() if window[-1][3] and len(window) > 1 else None
+            if heading:
+                # Keep a heading together with the text that follows it
+                window_tokens -= heading[1]
+                yield emit()
+                window, window_tokens = [heading], heading[1]
+            else:
+                yield emit()
+                window, window_tokens = carry()
+            if window_tokens + tokens > max_tokens:
+                window, window_tokens = [], 0
+        window.append(unit)
+        window_tokens += tokens
+    if window:
+        yield emit()
+
+
+def report_progress(items, progress, stage, counter):
+    """Pass items through, calling progress(stage, **{counter: n}) as each one arrives."""
+    for count, item in enumerate(items, start=1):
+        progress(stage, **{counter: count})
+        yield item
@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# ✅ Load environment variables once per process. Backend modules import this
+# module for the side effect instead of calling load_dotenv() themselves.
+load_dotenv()
@@ -0,0 +1,134 @@
+import os
+import threading
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+from backend.chunking import count_tokens
+
+# Chunks whose cosine similarity to the query is below this are dropped
+CONTEXT_MIN_SIMILARITY = float(os.getenv("CONTEXT_MIN_SIMILARITY", "0.3"))
+# Chunks this similar to an already selected chunk are treated as duplicates
+CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.95"))
+# MMR trade-off: 1.0 = relevance only, 0.0 = diversity only
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# Token budget for the packed context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Optional local cross-encoder for reranking, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2 ("" = off)
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Load the CPU cross-encoder named by RERANK_MODEL on first use (None if disabled)."""
+    global _reranker
+    if not RERANK_MODEL:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(RERANK_MODEL, device="cpu")
+                print(f"✅ Loaded reranker: {RERANK_MODEL}")
+    return _reranker
+
+
+def _relevance(chunks, vectors, query_vector):
+    """Cosine similarity to the query where known, else a rank-based stand-in."""
+    n = len(chunks)
+    relevance = np.linspace(1.0, 0.5, n) if n > 1 else np.ones(n)
+    if query_vector is not None:
+        for i, vector in enumerate(vectors):
+            if vector is not None and len(vector) == len(query_vector):
+                relevance[i] = float(vector @ query_vector)
+    return relevance
+
+
+def mmr_order(relevance, vectors, lambda_=CONTEXT_MMR_LAMBDA, dedup=CONTEXT_DEDUP_SIMILARITY):
+    """
+    Order candidates by maximal marginal relevance, dropping any candidate
+    whose similarity to an already selected one is at least `dedup`.
+    Candidates without a vector never count as redundant.
+    """
+    remaining = list(range(len(relevance)))
+    selected = []
+    while remaining:
+        best, best_score = None, None
+        for i in list(remaining):
+            redundancy = 0.0
+            if vectors[i] is not None:
+                sims = [float(vectors[i] @ vectors[j]) for j in selected
+                        if vectors[j] is not None and len(vectors[j]) == len(vectors[i])]
+                redundancy = max(sims, default=0.0)
+            if redundancy >= dedup:
+                remaining.remove(i)
+                continue
+            score = lambda_ * relevance[i] - (1 - lambda_) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+def _trim_to_budget(text, budget):
+    """Leading words of `text` that fit in `budget` tokens."""
+    words, used = [], 0
+    for word in text.split():
+        tokens = count_tokens(" " + word)
+        if used + tokens > budget:
+            break
+        words.append(word)
+        used += tokens
+    return " ".join(words)
+
+
+def pack_context(query, chunks, vectors=None, query_vector=None, token_budget=CONTEXT_TOKEN_BUDGET,
+                 min_similarity=CONTEXT_MIN_SIMILARITY, reranker=None):
+    """
+    Post-retrieval stage that shrinks the prompt context.
+
+    `chunks` are (chunk_id, document_id, text_chunk, score) rows, best first,
+    and `vectors` their unit embeddings (None where unknown). Steps:
+    similarity floor (the best chunk is always kept), MMR ordering with
+    near-duplicate removal, optional cross-encoder rerank, then whole chunks
+    are added until `token_budget` is reached.
+    Returns (packed chunks, report) where report has the chunk and token
+    counts before and after.
+    """
+    vectors = list(vectors) if vectors is not None else [None] * len(chunks)
+    tokens = [count_tokens(chunk[2]) for chunk in chunks]
+    report = {"chunks_before": len(chunks), "context_tokens_before": sum(tokens)}
+    if not chunks:
+        report.update(chunks_after=0, context_tokens_after=0)
+        return [], report
+
+    # 1️⃣ Similarity floor
+    relevance = _relevance(chunks, vectors, query_vector)
+    keep = [i for i in range(len(chunks)) if i == 0 or query_vector is None or relevance[i] >= min_similarity]
+
+    # 2️⃣ MMR / dedup
+    order = [keep[i] for i in mmr_order(relevance[keep], [vectors[i] for i in keep])]
+
+    # 3️⃣ Optional cross-encoder rerank
+    reranker = reranker if reranker is not None else get_reranker()
+    if reranker is not None and len(order) > 1:
+        scores = reranker.predict([(query, chunks[i][2]) for i in order])
+        order = [i for _, i in sorted(zip(scores, order), key=lambda pair: -pair[0])]
+
+    # 4️⃣ Token budget
+    packed, used = [], 0
+    for i in order:
+        if used + tokens[i] <= token_budget:
+            packed.append(chunks[i])
+            used += tokens[i]
+        elif not packed:
+            text = _trim_to_budget(chunks[i][2], token_budget)
+            packed.append((chunks[i][0], chunks[i][1], text, chunks[i][3]))
+            used += count_tokens(text)
+            break
+
+    report.update(chunks_after=len(packed), context_tokens_after=used)
+    return packed, report
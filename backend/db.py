@@ -1,34 +1,283 @@
 import os
-import mysql.connector
-from dotenv import load_dotenv
-import json
+import threading
+import backend.config  # noqa: F401  (loads .env)
+from backend import metrics
+from backend.vector_codec import encode_vector, decode_vector
+
+# "mysql", or "sqlite" for a local single-file database (SQLITE_PATH) used by
+# benchmarks and offline development
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+
+# On-disk vector format for embeddings.embedding_bin: float32 | float16 | int8
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32").lower()
+
+# Connections kept open by the process-wide pool (mysql-connector caps it at 32)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+# Rows per executemany() round-trip in insert_embeddings_bulk()
+DB_INSERT_BATCH = int(os.getenv("DB_INSERT_BATCH", "500"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Callbacks fired after embedding rows are committed, e.g. to keep the
+# in-memory vector index current. Each receives a list of
+# (id, document_id, text_chunk, embedding) tuples.
+_insert_listeners = []
+# Callbacks fired after embedding rows are deleted. Each receives
+# (document_ids, chunk_ids); chunk_ids is None when the whole documents
+# were removed.
+_delete_listeners = []
+
+
+def register_insert_listener(callback):
+    """Register a callback to be notified of newly committed embedding rows."""
+    if callback not in _insert_listeners:
+        _insert_listeners.append(callback)
+
+
+def register_delete_listener(callback):
+    """Register a callback to be notified of deleted documents and chunks."""
+    if callback not in _delete_listeners:
+        _delete_listeners.append(callback)
+
+
+def _notify_insert(rows):
+    for callback in _insert_listeners:
+        try:
+            callback(rows)
+        except Exception as e:
+            print(f"⚠️ Insert listener failed: {e}")
+
+
+def _notify_delete(doc_ids, chunk_ids=None):
+    for callback in _delete_listeners:
+        try:
+            callback(doc_ids, chunk_ids)
+        except Exception as e:
+            print(f"⚠️ Delete listener failed: {e}")
+
+
+def _connection_config():
+    return dict(
+        host=os.getenv("MYSQL_HOST", "127.0.0.1"),  # force TCP instead of pipe
+        user=os.getenv("MYSQL_USER", "root"),
+        password=os.getenv("MYSQL_PASSWORD", ""),
+        database=os.getenv("MYSQL_DATABASE", "multimodal_db"),
+        connection_timeout=10
+    )
+
+
+def _get_pool():
+    """Create the process-wide connection pool (and bootstrap the schema) once."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from mysql.connector import pooling
+
+                pool = pooling.MySQLConnectionPool(
+                    pool_name="multimodal_pool",
+                    pool_size=DB_POOL_SIZE,
+                    **_connection_config()
+                )
+                print(f"✅ Connected to MySQL successfully (pool size {DB_POOL_SIZE}).")
+                init_schema(pool.get_connection())
+                _pool = pool
+    return _pool
+
+
+def _row_bytes(row):
+    values = row.values() if isinstance(row, dict) else row or ()
+    return sum(len(v) for v in values if isinstance(v, (str, bytes, bytearray)))
+
+
+class _MeteredCursor:
+    """
+    Cursor proxy that times statements and fetches as the "db" stage and
+    counts round-trips and bytes read (backend/metrics.py).
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, *args, **kwargs):
+        metrics.inc("db_round_trips_total")
+        with metrics.span("db"):
+            return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        metrics.inc("db_round_trips_total")
+        with metrics.span("db"):
+            return self._cursor.executemany(*args, **kwargs)
+
+    def fetchone(self):
+        with metrics.span("db"):
+            row = self._cursor.fetchone()
+        metrics.inc("bytes_read_total", _row_bytes(row), source="db")
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        with metrics.span("db"):
+            rows = self._cursor.fetchmany(*args, **kwargs)
+        metrics.inc("bytes_read_total", sum(_row_bytes(r) for r in rows), source="db")
+        return rows
+
+    def fetchall(self):
+        with metrics.span("db"):
+            rows = self._cursor.fetchall()
+        metrics.inc("bytes_read_total", sum(_row_bytes(r) for r in rows), source="db")
+        return rows
+
+
+class _MeteredConnection:
+    """Connection proxy whose cursors, commits and close are metered; everything else passes through."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _MeteredCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        metrics.inc("db_round_trips_total")
+        with metrics.span("db"):
+            return self._conn.commit()
+
+    def close(self):
+        with metrics.span("db"):
+            return self._conn.close()
 
-# ✅ Load environment variables from .env
-load_dotenv()
 
 def get_connection():
-    """Create and return a MySQL connection using .env variables."""
-    try:
-        conn = mysql.connector.connect(
-            host=os.getenv("MYSQL_HOST", "127.0.0.1"),  # force TCP instead of pipe
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD", ""),
-            database=os.getenv("MYSQL_DATABASE", "multimodal_db"),
-            connection_timeout=10
-        )
-        if conn.is_connected():
-            print("✅ Connected to MySQL successfully.")
-            return conn
+    """
+    Return a MySQL connection from the process-wide pool. Calling close() on
+    it hands it back to the pool. If the pool is exhausted a standalone
+    connection is opened instead. With DB_BACKEND=sqlite the connection comes
+    from backend/sqlite_db.py instead. Statements run through it are metered.
+    """
+    with metrics.span("db"):
+        conn = _open_connection()
+    return _MeteredConnection(conn) if conn is not None else None
+
+
+def _open_connection():
+    if DB_BACKEND == "sqlite":
+        from backend.sqlite_db import get_connection as get_sqlite_connection
+        return get_sqlite_connection()
+
+    import mysql.connector  # imported on first use to keep module import cheap
+
+    try:
+        return _get_pool().get_connection()
+    except mysql.connector.errors.PoolError:
+        try:
+            conn = mysql.connector.connect(**_connection_config())
+            if conn.is_connected():
+                return conn
+        except mysql.connector.Error as e:
+            print(f"❌ Error connecting to MySQL: {e}")
+        return None
     except mysql.connector.Error as e:
         print(f"❌ Error connecting to MySQL: {e}")
         return None
 
 
-def insert_document(doc_id, text):
-    """Insert a document into the documents table."""
-    conn = get_connection()
+def column_exists(cursor, table, column):
+    """Return True if `table` already has `column` in the current database."""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def index_exists(cursor, table, index_name):
+    """Return True if `table` already has an index called `index_name`."""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """,
+        (table, index_name)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+# Columns added to the embeddings table after its first release
+EMBEDDING_COLUMNS = [
+    ("embedding_bin", "BLOB NULL"),
+    ("source_unit", "VARCHAR(16) NULL"),   # page / slide / paragraph / line / time
+    ("source_start", "DOUBLE NULL"),       # first page/slide/... or start second
+    ("source_end", "DOUBLE NULL"),
+    ("token_count", "INT NULL"),
+]
+
+
+# Columns and indexes added to the documents table after its first release
+DOCUMENT_COLUMNS = [
+    ("file_hash", "CHAR(64) NULL"),
+    ("filename", "VARCHAR(512) NULL"),
+    ("mime_type", "VARCHAR(127) NULL"),
+    ("size_bytes", "BIGINT NULL"),
+    ("source_type", "VARCHAR(16) NULL"),   # text / audio / video / image
+    ("created_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+    ("source_path", "VARCHAR(512) NULL"),     # absolute path the document was ingested from
+    ("version", "INT NOT NULL DEFAULT 1"),    # bumped by every incremental update
+    ("updated_at", "TIMESTAMP NULL"),
+    ("pending_content", "LONGTEXT NULL"),     # next version's text, swapped in by update_document_chunks
+]
+DOCUMENT_INDEXES = [
+    ("idx_documents_doc_id", "doc_id"),
+    ("idx_documents_file_hash", "file_hash"),
+    ("idx_documents_source_type", "source_type, created_at"),
+    ("idx_documents_created_at", "created_at"),
+]
+
+
+def ensure_embeddings_table(cursor):
+    """
+    Create the embeddings table if needed and upgrade tables created by older
+    versions (binary vector column, document_id index, chunk source span and
+    token count). The legacy JSON column
+    is kept (NULL for new rows) until backend/migrate_embeddings.py has
+    converted old rows.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            document_id VARCHAR(255),
+            chunk_index INT,
+            text_chunk LONGTEXT,
+            embedding JSON NULL,
+            embedding_bin BLOB NULL,
+            source_unit VARCHAR(16) NULL,
+            source_start DOUBLE NULL,
+            source_end DOUBLE NULL,
+            token_count INT NULL,
+            INDEX idx_embeddings_document (document_id)
+        )
+    """)
+    for column, definition in EMBEDDING_COLUMNS:
+        if not column_exists(cursor, "embeddings", column):
+            cursor.execute(f"ALTER TABLE embeddings ADD COLUMN {column} {definition}")
+    if not index_exists(cursor, "embeddings", "idx_embeddings_document"):
+        cursor.execute("CREATE INDEX idx_embeddings_document ON embeddings (document_id)")
+
+
+def init_schema(conn=None):
+    """Create/upgrade all tables. Runs once per process when the pool is created."""
+    conn = conn or get_connection()
     if conn is None:
-        print("❌ No DB connection for insert_document()")
+        print("❌ No DB connection for init_schema()")
         return
     try:
         cursor = conn.cursor()
@@ -36,19 +285,402 @@ def insert_document(doc_id, text):
             CREATE TABLE IF NOT EXISTS documents (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 doc_id VARCHAR(255),
-                content LONGTEXT
+                content LONGTEXT,
+                file_hash CHAR(64) NULL,
+                filename VARCHAR(512) NULL,
+                mime_type VARCHAR(127) NULL,
+                size_bytes BIGINT NULL,
+                source_type VARCHAR(16) NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                source_path VARCHAR(512) NULL,
+                version INT NOT NULL DEFAULT 1,
+                updated_at TIMESTAMP NULL,
+                pending_content LONGTEXT NULL
+            )
+        """)
+        for column, definition in DOCUMENT_COLUMNS:
+            if not column_exists(cursor, "documents", column):
+                cursor.execute(f"ALTER TABLE documents ADD COLUMN {column} {definition}")
+        for index_name, columns in DOCUMENT_INDEXES:
+            if not index_exists(cursor, "documents", index_name):
+                cursor.execute(f"CREATE INDEX {index_name} ON documents ({columns})")
+        ensure_embeddings_table(cursor)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                cache_key CHAR(64) PRIMARY KEY,
+                model VARCHAR(255),
+                task_type VARCHAR(64),
+                embedding_bin BLOB,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        print(f"❌ Failed to initialise schema: {e}")
+    finally:
+        conn.close()
+
+
+def insert_document(doc_id, text, file_hash=None, metadata=None):
+    """
+    Insert a document into the documents table. `metadata` may carry
+    filename, mime_type, size_bytes, source_type and source_path.
+    """
+    metadata = metadata or {}
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for insert_document()")
+        return
+    try:
+        cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO documents (doc_id, content) VALUES (%s, %s)",
-            (doc_id, text)
+            "INSERT INTO documents (doc_id, content, file_hash, filename, mime_type, size_bytes, source_type, "
+            "source_path) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            (doc_id, text, file_hash, metadata.get("filename"), metadata.get("mime_type"),
+             metadata.get("size_bytes"), metadata.get("source_type"), metadata.get("source_path"))
         )
         conn.commit()
         cursor.close()
-        conn.close()
         print(f"✅ Document '{doc_id}' inserted successfully.")
     except Exception as e:
         print(f"❌ Failed to insert document: {e}")
+    finally:
+        conn.close()
+
+
+def append_document_content(doc_id, text, staged=False):
+    """
+    Append a window of extracted text to a document's stored content, or
+    to its staged next version (see stage_document_content) if `staged`.
+    """
+    column = "pending_content" if staged else "content"
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for append_document_content()")
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE documents SET {column} = CONCAT(COALESCE({column}, ''), %s) WHERE doc_id = %s",
+            (text, doc_id)
+        )
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        print(f"❌ Failed to append document content: {e}")
+    finally:
+        conn.close()
+
+
+def set_document_hash(doc_id, file_hash):
+    """Record the file hash of a fully ingested document (enables upload dedup)."""
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for set_document_hash()")
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE documents SET file_hash = %s WHERE doc_id = %s", (file_hash, doc_id))
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        print(f"❌ Failed to record document hash: {e}")
+    finally:
+        conn.close()
+
+
+def find_document_by_hash(file_hash, preview_chars=None):
+    """
+    Return (doc_id, content) of a document already stored with this file hash,
+    or None. With `preview_chars`, only that many leading characters are read.
+    """
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for find_document_by_hash()")
+        return None
+    try:
+        cursor = conn.cursor()
+        if preview_chars:
+            cursor.execute(
+                "SELECT doc_id, SUBSTRING(content, 1, %s) FROM documents WHERE file_hash = %s ORDER BY id LIMIT 1",
+                (preview_chars, file_hash)
+            )
+        else:
+            cursor.execute(
+                "SELECT doc_id, content FROM documents WHERE file_hash = %s ORDER BY id LIMIT 1",
+                (file_hash,)
+            )
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+    except Exception as e:
+        print(f"❌ Failed to look up document hash: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_document(doc_id, preview_chars=None):
+    """
+    Return a document's metadata and version (not its content) as a dict, or
+    None. With `preview_chars`, the leading characters of its content are
+    included as "preview".
+    """
+    preview = ", SUBSTRING(content, 1, %s) AS preview" if preview_chars else ""
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for get_document()")
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT doc_id, file_hash, filename, mime_type, size_bytes, source_type, source_path, version, "
+            f"created_at, updated_at{preview} FROM documents WHERE doc_id = %s ORDER BY id LIMIT 1",
+            (preview_chars, doc_id) if preview_chars else (doc_id,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+    except Exception as e:
+        print(f"❌ Failed to read document '{doc_id}': {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def iter_document_chunks(doc_id):
+    """
+    Yield a document's stored chunks as
+    (id, chunk_index, text_chunk, source_unit, source_start, source_end)
+    rows, read DB_INSERT_BATCH rows at a time.
+    """
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for iter_document_chunks()")
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, chunk_index, text_chunk, source_unit, source_start, source_end FROM embeddings "
+            "WHERE document_id = %s ORDER BY chunk_index, id",
+            (doc_id,)
+        )
+        while True:
+            batch = cursor.fetchmany(DB_INSERT_BATCH)
+            if not batch:
+                break
+            yield from batch
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def stage_document_content(doc_id, discard=False):
+    """
+    Start (or, with `discard`, drop) the staged content of a document's next
+    version. A new version's text is appended to pending_content in windows
+    and only replaces content inside the update_document_chunks()
+    transaction, so a failed update leaves the current version intact.
+    """
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for stage_document_content()")
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE documents SET pending_content = %s WHERE doc_id = %s",
+            (None if discard else "", doc_id)
+        )
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        print(f"❌ Failed to stage document content: {e}")
+    finally:
+        conn.close()
+
+
+def delete_document(doc_id):
+    """
+    Delete a document and all of its chunks in one transaction. Returns the
+    number of chunks removed, or None on failure.
+    """
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for delete_document()")
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM embeddings WHERE document_id = %s", (doc_id,))
+        removed = cursor.rowcount
+        cursor.execute("DELETE FROM documents WHERE doc_id = %s", (doc_id,))
+        conn.commit()
+        cursor.close()
+        print(f"🗑️ Deleted document '{doc_id}' ({removed} chunks)")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Failed to delete document '{doc_id}': {e}")
+        return None
+    finally:
+        conn.close()
+    _notify_delete([doc_id])
+    return removed
+
+
+def update_document_chunks(doc_id, rows, changes, file_hash, metadata=None):
+    """
+    Apply an incremental re-ingest of a document in one transaction.
+
+    `rows` (chunk_index, text_chunk, embedding, meta) are the new or edited
+    chunks; like insert_embeddings_bulk() they may be a generator and are
+    inserted DB_INSERT_BATCH at a time. Once they are exhausted `changes()`
+    must return (moved, removed_ids): unchanged chunks given a new position
+    as (id, chunk_index, meta), and stored chunks that are gone. The
+    document row then gets the new hash and metadata with its version
+    bumped, and its staged content (see stage_document_content) replaces
+    the current content. Listeners
+    see the removed chunk ids and the inserted rows. Returns the new
+    version, or None on failure.
+    """
+    metadata = metadata or {}
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for update_document_chunks()")
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM embeddings WHERE document_id = %s", (doc_id,))
+        last_id = cursor.fetchone()[0]
+        inserted = 0
+        batch = []
+        for row in rows:
+            batch.append(_embedding_params(doc_id, row))
+            if len(batch) >= DB_INSERT_BATCH:
+                cursor.executemany(_INSERT_EMBEDDING, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(_INSERT_EMBEDDING, batch)
+            inserted += len(batch)
+
+        moved, removed_ids = changes()
+        if moved:
+            cursor.executemany(
+                "UPDATE embeddings SET chunk_index = %s, source_unit = %s, source_start = %s, source_end = %s "
+                "WHERE id = %s",
+                [(chunk_index, meta.get("source_unit"), meta.get("source_start"), meta.get("source_end"), row_id)
+                 for row_id, chunk_index, meta in moved]
+            )
+        for start in range(0, len(removed_ids), DB_INSERT_BATCH):
+            batch = removed_ids[start:start + DB_INSERT_BATCH]
+            cursor.execute(f"DELETE FROM embeddings WHERE id IN ({', '.join(['%s'] * len(batch))})", tuple(batch))
+        cursor.execute(
+            "UPDATE documents SET file_hash = %s, filename = %s, mime_type = %s, size_bytes = %s, "
+            "source_type = %s, source_path = %s, version = version + 1, updated_at = CURRENT_TIMESTAMP, "
+            "content = COALESCE(pending_content, content), pending_content = NULL "
+            "WHERE doc_id = %s",
+            (file_hash, metadata.get("filename"), metadata.get("mime_type"), metadata.get("size_bytes"),
+             metadata.get("source_type"), metadata.get("source_path"), doc_id)
+        )
+        cursor.execute("SELECT version FROM documents WHERE doc_id = %s", (doc_id,))
+        version = cursor.fetchone()[0]
+        conn.commit()
+        print(f"✅ Document '{doc_id}' is now version {version} "
+              f"({inserted} chunks inserted, {len(removed_ids)} removed, {len(moved)} moved)")
+
+        _notify_delete([doc_id], list(removed_ids))
+        if inserted and _insert_listeners:
+            _notify_document_rows(cursor, doc_id, after_id=last_id)
+        cursor.close()
+        return version
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Failed to update document '{doc_id}': {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def find_document_ids(document_ids=None, source_type=None, uploaded_after=None):
+    """
+    Return the doc_ids matching all given filters (uses the documents
+    indexes). `uploaded_after` is a datetime or 'YYYY-MM-DD[ HH:MM:SS]' string.
+    """
+    clauses, params = [], []
+    if document_ids:
+        clauses.append(f"doc_id IN ({', '.join(['%s'] * len(document_ids))})")
+        params.extend(document_ids)
+    if source_type:
+        clauses.append("source_type = %s")
+        params.append(source_type)
+    if uploaded_after:
+        clauses.append("created_at > %s")
+        params.append(uploaded_after)
+
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for find_document_ids()")
+        return []
+    try:
+        cursor = conn.cursor()
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor.execute(f"SELECT doc_id FROM documents{where}", params)
+        doc_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return doc_ids
+    except Exception as e:
+        print(f"❌ Failed to filter documents: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def fetch_cached_embeddings(cache_keys):
+    """Return {cache_key: vector} for the keys present in embedding_cache."""
+    if not cache_keys:
+        return {}
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for fetch_cached_embeddings()")
+        return {}
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(cache_keys))
+        cursor.execute(
+            f"SELECT cache_key, embedding_bin FROM embedding_cache WHERE cache_key IN ({placeholders})",
+            tuple(cache_keys)
+        )
+        found = {key: decode_vector(blob) for key, blob in cursor.fetchall()}
+        cursor.close()
+        return found
+    except Exception as e:
+        print(f"⚠️ Embedding cache lookup failed: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def store_cached_embeddings(rows):
+    """Add (cache_key, model, task_type, embedding) rows to embedding_cache."""
+    if not rows:
+        return
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for store_cached_embeddings()")
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT IGNORE INTO embedding_cache (cache_key, model, task_type, embedding_bin) VALUES (%s, %s, %s, %s)",
+            [(key, model, task_type, encode_vector(vector, EMBEDDING_STORAGE)) for key, model, task_type, vector in rows]
+        )
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        print(f"⚠️ Embedding cache write failed: {e}")
+    finally:
+        conn.close()
 
 
 def insert_embedding(document_id, chunk_index, text_chunk, embedding):
@@ -59,22 +691,90 @@ def insert_embedding(document_id, chunk_index, text_chunk, embedding):
         return
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS embeddings (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                document_id VARCHAR(255),
-                chunk_index INT,
-                text_chunk LONGTEXT,
-                embedding JSON
-            )
-        """)
         cursor.execute(
-            "INSERT INTO embeddings (document_id, chunk_index, text_chunk, embedding) VALUES (%s, %s, %s, %s)",
-            (document_id, chunk_index, text_chunk, json.dumps(embedding))
+            "INSERT INTO embeddings (document_id, chunk_index, text_chunk, embedding_bin) VALUES (%s, %s, %s, %s)",
+            (document_id, chunk_index, text_chunk, encode_vector(embedding, EMBEDDING_STORAGE))
         )
         conn.commit()
+        row_id = cursor.lastrowid
         cursor.close()
-        conn.close()
         print(f"✅ Inserted embedding chunk {chunk_index} for document '{document_id}'")
+        _notify_insert([(row_id, document_id, text_chunk, embedding)])
     except Exception as e:
         print(f"❌ Failed to insert embedding: {e}")
+    finally:
+        conn.close()
+
+
+_INSERT_EMBEDDING = (
+    "INSERT INTO embeddings (document_id, chunk_index, text_chunk, embedding_bin, "
+    "source_unit, source_start, source_end, token_count) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def _embedding_params(document_id, row):
+    """Statement parameters for one (chunk_index, text_chunk, embedding[, meta]) row."""
+    chunk_index, text_chunk, embedding = row[:3]
+    meta = row[3] if len(row) > 3 else {}
+    return (
+        document_id, chunk_index, text_chunk, encode_vector(embedding, EMBEDDING_STORAGE),
+        meta.get("source_unit"), meta.get("source_start"), meta.get("source_end"), meta.get("token_count"),
+    )
+
+
+def insert_embeddings_bulk(document_id, rows):
+    """
+    Insert many (chunk_index, text_chunk, embedding[, meta]) rows for one
+    document. `meta` is the chunker's dict with source_unit, source_start,
+    source_end and token_count (all optional).
+
+    `rows` may be any iterable (e.g. a generator fed by the embedder); it is
+    consumed DB_INSERT_BATCH rows at a time with executemany() and committed
+    as a single transaction, so a failure leaves no partial document behind.
+    Returns the number of rows inserted.
+    """
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for insert_embeddings_bulk()")
+        return 0
+
+    inserted = 0
+    try:
+        cursor = conn.cursor()
+        batch = []
+        for row in rows:
+            batch.append(_embedding_params(document_id, row))
+            if len(batch) >= DB_INSERT_BATCH:
+                cursor.executemany(_INSERT_EMBEDDING, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(_INSERT_EMBEDDING, batch)
+            inserted += len(batch)
+        conn.commit()
+        print(f"✅ Inserted {inserted} embedding chunks for document '{document_id}'")
+
+        if inserted and _insert_listeners:
+            _notify_document_rows(cursor, document_id)
+        cursor.close()
+    except Exception as e:
+        conn.rollback()
+        inserted = 0
+        print(f"❌ Failed to bulk insert embeddings for '{document_id}': {e}")
+    finally:
+        conn.close()
+    return inserted
+
+
+def _notify_document_rows(cursor, document_id, after_id=0):
+    """Stream a document's committed rows with id > after_id (with their new ids) to the listeners."""
+    cursor.execute(
+        "SELECT id, document_id, text_chunk, embedding_bin FROM embeddings WHERE document_id = %s AND id > %s "
+        "ORDER BY id",
+        (document_id, after_id)
+    )
+    while True:
+        batch = cursor.fetchmany(DB_INSERT_BATCH)
+        if not batch:
+            break
+        _notify_insert([(r[0], r[1], r[2], decode_vector(r[3])) for r in batch])
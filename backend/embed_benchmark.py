@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+from backend.embedding_provider import (
+    SentenceTransformerProvider, LOCAL_EMBED_BATCH_SIZE, LOCAL_BUCKET_SIZE, LOCAL_EMBED_THREADS,
+)
+from backend.generate_embeddings import LOCAL_MODEL, chunk_text
+
+# An optimized backend fails the parity check if any chunk's vector has a
+# lower cosine similarity than this to the reference (fp32 torch) vector
+PARITY_MIN_COSINE = float(os.getenv("PARITY_MIN_COSINE", "0.95"))
+# Nearest neighbours compared between reference and optimized vectors
+PARITY_NEIGHBOURS = 10
+
+_WORDS = ("the system stores documents and answers questions about uploaded files using embeddings "
+          "retrieval context model query chunk index audio video image text page slide transcript "
+          "search vector keyword latency throughput database cache server request response error").split()
+
+
+def sample_texts(count=512, seed=0, path=None):
+    """
+    Chunks to embed: the chunker's output for `path` if given, else synthetic
+    texts from a few words to a full chunk, so batches mix lengths like real
+    ingests do.
+    """
+    if path:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            return [chunk for chunk, _ in chunk_text(f.read())][:count]
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(_WORDS, k=min(200, int(rng.paretovariate(1.2) * 8)))) for _ in range(count)]
+
+
+def padding_ratio(token_lengths, char_lengths, batch_size, bucket_size):
+    """
+    Fraction of padded positions when each batch of `batch_size` texts is
+    length-sorted (by characters, as sentence-transformers does) and encoded
+    in passes of `bucket_size`.
+    """
+    padded = real = 0
+    for start in range(0, len(token_lengths), batch_size):
+        batch = range(start, min(start + batch_size, len(token_lengths)))
+        ordered = sorted(batch, key=lambda i: -char_lengths[i])
+        for first in range(0, len(ordered), bucket_size):
+            bucket = [token_lengths[i] for i in ordered[first:first + bucket_size]]
+            padded += max(bucket) * len(bucket)
+            real += sum(bucket)
+    return round(1 - real / padded, 4) if padded else 0.0
+
+
+def embed_all(provider, texts):
+    """Embed `texts` through embed_batch (no cache, no scheduler); returns (vectors, seconds)."""
+    provider.embed_batch(texts[:provider.bucket_size])  # warm-up pass
+    started = time.perf_counter()
+    vectors = []
+    for start in range(0, len(texts), provider.batch_size):
+        vectors.extend(provider.embed_batch(texts[start:start + provider.batch_size]))
+    return np.vstack(vectors), time.perf_counter() - started
+
+
+def _unit(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def parity(reference, candidate, neighbours=PARITY_NEIGHBOURS):
+    """Per-chunk cosine similarity to the reference, and overlap of each chunk's nearest neighbours."""
+    reference, candidate = _unit(reference), _unit(candidate)
+    cosines = np.sum(reference * candidate, axis=1)
+    k = min(neighbours, len(reference) - 1)
+    overlap = None
+    if k > 0:
+        ref_nn = np.argsort(-(reference @ reference.T), axis=1)[:, 1:k + 1]
+        cand_nn = np.argsort(-(candidate @ candidate.T), axis=1)[:, 1:k + 1]
+        overlap = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_nn, cand_nn)]))
+    return {
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        f"neighbour_overlap@{k}": round(overlap, 4) if overlap is not None else None,
+    }
+
+
+def compare_backends(texts, backends=("torch", "int8", "onnx"), threads=LOCAL_EMBED_THREADS,
+                     batch_size=LOCAL_EMBED_BATCH_SIZE, bucket_size=LOCAL_BUCKET_SIZE, model_name=LOCAL_MODEL):
+    """
+    Embed `texts` with the reference setup (fp32 torch, one padded pass per
+    batch, as before length bucketing) and with each backend using length
+    buckets. Returns one result row per setup: chunks/sec, speed-up over the
+    reference, and parity with the reference vectors.
+    """
+    reference = SentenceTransformerProvider(model_name, batch_size=batch_size, backend="torch",
+                                            threads=threads, bucket_size=batch_size)
+    ref_vectors, ref_seconds = embed_all(reference, texts)
+    tokenizer = reference.model.tokenizer
+    token_lengths = [len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"]]
+    char_lengths = [len(t) for t in texts]
+
+    rows = [{
+        "setup": "reference (torch fp32, unbucketed)",
+        "chunks_per_sec": round(len(texts) / ref_seconds, 1),
+        "speedup": 1.0,
+        "padding_ratio": padding_ratio(token_lengths, char_lengths, batch_size, batch_size),
+    }]
+    for backend in backends:
+        provider = SentenceTransformerProvider(model_name, batch_size=batch_size, backend=backend,
+                                               threads=threads, bucket_size=bucket_size)
+        try:
+            vectors, seconds = embed_all(provider, texts)
+        except Exception as e:
+            rows.append({"setup": backend, "error": str(e)})
+            continue
+        if backend == "onnx" and getattr(provider.model, "backend", "torch") != "onnx":
+            rows.append({"setup": backend, "error": "ONNX Runtime / Optimum not installed"})
+            continue
+        rows.append({
+            "setup": f"{backend} (buckets of {bucket_size})",
+            "chunks_per_sec": round(len(texts) / seconds, 1),
+            "speedup": round(ref_seconds / seconds, 2),
+            "padding_ratio": padding_ratio(token_lengths, char_lengths, batch_size, bucket_size),
+            **parity(ref_vectors, vectors),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    # Parity + throughput: python -m backend.embed_benchmark [--backends torch,int8,onnx] [--threads 4]
+    parser = argparse.ArgumentParser(description="Compare local embedding backends against the fp32 reference.")
+    parser.add_argument("--backends", default="torch,int8,onnx")
+    parser.add_argument("--texts", type=int, default=512, help="Number of chunks to embed")
+    parser.add_argument("--file", default=None, help="Chunk this text file instead of using synthetic texts")
+    parser.add_argument("--threads", type=int, default=LOCAL_EMBED_THREADS)
+    parser.add_argument("--batch-size", type=int, default=LOCAL_EMBED_BATCH_SIZE)
+    parser.add_argument("--bucket-size", type=int, default=LOCAL_BUCKET_SIZE)
+    parser.add_argument("--min-cosine", type=float, default=PARITY_MIN_COSINE)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    texts = sample_texts(args.texts, path=args.file)
+    rows = compare_backends(texts, [b.strip() for b in args.backends.split(",") if b.strip()],
+                            args.threads, args.batch_size, args.bucket_size)
+    failed = [row["setup"] for row in rows if row.get("min_cosine", 1.0) < args.min_cosine]
+    if args.json:
+        print(json.dumps({"texts": len(texts), "results": rows, "failed_parity": failed}, indent=2))
+    else:
+        for row in rows:
+            if "error" in row:
+                print(f"⚠️ {row['setup']} skipped: {row['error']}")
+                continue
+            parity_text = f", min cosine {row['min_cosine']}" if "min_cosine" in row else ""
+            print(f"📊 {row['setup']}: {row['chunks_per_sec']} chunks/sec (x{row['speedup']}), "
+                  f"padding {row['padding_ratio']:.0%}{parity_text}")
+        for setup in failed:
+            print(f"❌ {setup} failed the parity check (min cosine < {args.min_cosine})")
+        if not failed:
+            print("✅ All backends match the reference vectors")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,159 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import backend.config  # noqa: F401  (loads .env)
+
+# Embedding requests kept in flight at once
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+# Budgets per rolling minute (0 = unlimited)
+EMBED_RPM = int(os.getenv("EMBED_RPM", "0"))
+EMBED_TPM = int(os.getenv("EMBED_TPM", "0"))
+# Retries for 429 / 5xx / transient network errors before giving up
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+}
+
+
+def estimate_tokens(texts):
+    """Cheap token estimate (~4 characters per token) for rate budgeting."""
+    return sum(len(t) // 4 + 1 for t in texts)
+
+
+def is_retryable(exc):
+    """True for rate-limit (429), server (5xx) and transient network errors."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if type(exc).__name__ in RETRYABLE_NAMES:
+        return True
+    status = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    try:
+        return int(status) in RETRYABLE_STATUS
+    except (TypeError, ValueError):
+        return False
+
+
+class RateLimiter:
+    """
+    Rolling one-minute budget for requests and tokens. acquire() blocks until
+    the request fits both budgets. `clock` and `sleep` are injectable so the
+    limiter can be driven by a fake clock.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, clock=time.monotonic, sleep=time.sleep):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._events = deque()  # (timestamp, tokens)
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, tokens, now):
+        while self._events and now - self._events[0][0] >= 60.0:
+            _, spent = self._events.popleft()
+            self._tokens -= spent
+        wait = 0.0
+        if self.requests_per_minute and len(self._events) >= self.requests_per_minute:
+            wait = max(wait, 60.0 - (now - self._events[0][0]))
+        if self.tokens_per_minute and self._events and self._tokens + tokens > self.tokens_per_minute:
+            # Wait until enough of the oldest spend has rolled out of the window
+            freed = 0
+            for ts, spent in self._events:
+                freed += spent
+                if self._tokens - freed + tokens <= self.tokens_per_minute:
+                    wait = max(wait, 60.0 - (now - ts))
+                    break
+            else:
+                # Larger than the whole budget: run once the window is empty
+                wait = max(wait, 60.0 - (now - self._events[-1][0]))
+        return wait
+
+    def acquire(self, tokens=0):
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    self._events.append((now, tokens))
+                    self._tokens += tokens
+                    return
+            self._sleep(wait)
+
+
+class EmbeddingScheduler:
+    """
+    Runs embedding requests concurrently while respecting rate budgets.
+
+    `embed_fn(texts)` performs one request (e.g. a Gemini batch call or a stub
+    talking to a local fake server) and returns one vector per text. map()
+    keeps up to `max_in_flight` requests running, retries retryable failures
+    with jittered exponential backoff, and yields results in submission order
+    so chunk_index ordering is preserved.
+    """
+
+    def __init__(self, embed_fn, max_in_flight=EMBED_CONCURRENCY, requests_per_minute=EMBED_RPM,
+                 tokens_per_minute=EMBED_TPM, max_retries=EMBED_MAX_RETRIES,
+                 base_delay=1.0, max_delay=30.0, sleep=time.sleep, limiter=None):
+        self.embed_fn = embed_fn
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self.limiter = limiter or RateLimiter(requests_per_minute, tokens_per_minute, sleep=sleep)
+
+    def _backoff(self, attempt):
+        # "Full jitter": uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, texts):
+        """Run one request with rate limiting and retries."""
+        if not texts:
+            return []
+        attempt = 0
+        while True:
+            self.limiter.acquire(estimate_tokens(texts))
+            try:
+                return self.embed_fn(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                print(f"⚠️ Embedding request failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                self._sleep(delay)
+
+    def map(self, batches):
+        """
+        Embed an iterable of text batches, yielding each batch's vectors in
+        input order. At most `max_in_flight` batches are pending at a time.
+        """
+        if self.max_in_flight == 1:
+            for texts in batches:
+                yield self.call(texts)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            pending = deque()
+            try:
+                for texts in batches:
+                    pending.append(pool.submit(self.call, texts))
+                    if len(pending) >= self.max_in_flight:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
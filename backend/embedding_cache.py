@@ -0,0 +1,54 @@
+import os
+import re
+import hashlib
+import unicodedata
+import backend.config  # noqa: F401  (loads .env)
+from backend.db import fetch_cached_embeddings, store_cached_embeddings
+
+# Set EMBED_CACHE=0 to always call the embedding model
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE", "1") != "0"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_chunk(text):
+    """Canonical form used for hashing: NFC unicode with collapsed whitespace."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model_name, task_type, text):
+    """Content address of an embedding: sha256 over (model, task_type, normalized chunk)."""
+    payload = "\x1f".join((model_name, task_type or "", normalize_chunk(text)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chunk_hash(text):
+    """sha256 of a normalized chunk; equal for chunks an update leaves unchanged."""
+    return hashlib.sha256(normalize_chunk(text).encode("utf-8")).hexdigest()
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """sha256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def lookup(model_name, task_type, texts):
+    """
+    Return (keys, vectors) for `texts`; vectors[i] is the cached embedding or
+    None on a miss.
+    """
+    keys = [cache_key(model_name, task_type, t) for t in texts]
+    if not EMBED_CACHE_ENABLED:
+        return keys, [None] * len(texts)
+    found = fetch_cached_embeddings(sorted(set(keys)))
+    return keys, [found.get(k) for k in keys]
+
+
+def store(model_name, task_type, keys, vectors):
+    """Record freshly computed embeddings under their content keys."""
+    if EMBED_CACHE_ENABLED:
+        store_cached_embeddings([(k, model_name, task_type, v) for k, v in zip(keys, vectors)])
@@ -0,0 +1,255 @@
+import os
+import threading
+from collections import deque
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+from backend.embed_scheduler import EmbeddingScheduler
+from backend import embedding_cache, metrics, registry
+
+# Chunks sent per embedding request / encode() call
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# The Gemini batch endpoint accepts at most 100 contents per request
+GEMINI_MAX_BATCH = 100
+# Local sentence-transformers inference: "torch" (fp32 eager), "int8" (torch
+# dynamic quantization of the Linear layers) or "onnx" (ONNX Runtime)
+LOCAL_EMBED_BACKEND = os.getenv("LOCAL_EMBED_BACKEND", "torch").lower()
+# Intra-op CPU threads for local inference (0 = library default)
+LOCAL_EMBED_THREADS = int(os.getenv("LOCAL_EMBED_THREADS", "0"))
+# Chunks per local embed_batch() call; a larger batch gives the length sort more to work with
+LOCAL_EMBED_BATCH_SIZE = int(os.getenv("LOCAL_EMBED_BATCH_SIZE", "256"))
+# Texts per forward pass; sentence-transformers sorts each batch by length
+# first, so smaller passes pad less
+LOCAL_BUCKET_SIZE = int(os.getenv("LOCAL_BUCKET_SIZE", "16"))
+# ONNX file inside the model repo, e.g. onnx/model_qint8_avx2.onnx for int8 ONNX ("" = onnx/model.onnx)
+LOCAL_ONNX_FILE = os.getenv("LOCAL_ONNX_FILE", "")
+# Overrides the provider every caller asks for, e.g. EMBED_PROVIDER=fake for
+# the deterministic offline embedder in backend/fake_models.py
+EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "")
+
+DOCUMENT_TASK = "retrieval_document"
+
+
+class EmbeddingProvider:
+    """
+    Base class for embedding backends.
+
+    Subclasses implement embed_batch(), which embeds a list of texts in a
+    single request/forward pass. embed_chunks() turns a stream of chunks into
+    a stream of embedded rows, batch_size chunks at a time, dispatching the
+    batches through an EmbeddingScheduler.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name, batch_size=EMBED_BATCH_SIZE, scheduler=None):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self._scheduler = scheduler
+
+    @property
+    def cache_model(self):
+        """Model name under which vectors are stored in the embedding cache."""
+        return self.model_name
+
+    def make_scheduler(self, embed_fn):
+        """Scheduler used for document embedding; local models run one batch at a time."""
+        return EmbeddingScheduler(embed_fn, max_in_flight=1)
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            self._scheduler = self.make_scheduler(self._embed_document_batch)
+        return self._scheduler
+
+    def _embed_document_batch(self, texts):
+        return self.embed_batch(texts, task_type=DOCUMENT_TASK)
+
+    def embed_batch(self, texts, task_type="retrieval_document"):
+        """Return one float32 vector per text, in order."""
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        return self.embed_batch([text], task_type="retrieval_query")[0]
+
+    def embed_chunks(self, chunks):
+        """
+        Embed an iterable of (chunk_index, text, *extra) tuples as documents,
+        yielding (chunk_index, text, embedding, *extra) rows in chunk order, so
+        chunk metadata rides along to the insert. Chunks already in
+        the content-addressed embedding cache are not sent to the model. Only
+        the batches in flight are held in memory, so the output can be
+        streamed straight into db.insert_embeddings_bulk. Raises ValueError
+        if the model returns a different number of vectors than it was sent.
+        """
+        task_type = DOCUMENT_TASK
+        batches = deque()
+
+        def misses_of_batches():
+            batch = []
+            for chunk in chunks:
+                text = chunk[1]
+                if not text or not text.strip():
+                    continue
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    yield self._prepare_batch(batch, task_type, batches)
+                    batch = []
+            if batch:
+                yield self._prepare_batch(batch, task_type, batches)
+
+        for fresh in self.scheduler.map(misses_of_batches()):
+            batch, keys, vectors = batches.popleft()
+            fresh = list(fresh)
+            miss_keys = [k for k, v in zip(keys, vectors) if v is None]
+            if len(fresh) != len(miss_keys):
+                # Pairing them up would store vectors under the wrong chunks
+                raise ValueError(f"{self.name} returned {len(fresh)} embeddings for {len(miss_keys)} chunks")
+            if fresh:
+                metrics.inc("chunks_embedded_total", len(fresh), provider=self.name)
+                embedding_cache.store(self.cache_model, task_type, miss_keys, fresh)
+            fresh_iter = iter(fresh)
+            for chunk, vector in zip(batch, vectors):
+                if vector is None:
+                    vector = next(fresh_iter, None)
+                if vector is None or len(vector) == 0:
+                    print(f"⚠️ Empty embedding returned for chunk {chunk[0]}")
+                    continue
+                yield (chunk[0], chunk[1], vector, *chunk[2:])
+
+    def _prepare_batch(self, batch, task_type, batches):
+        """Resolve cache hits for a batch and return the texts still to embed."""
+        texts = [chunk[1] for chunk in batch]
+        keys, vectors = embedding_cache.lookup(self.cache_model, task_type, texts)
+        batches.append((batch, keys, vectors))
+        hits = sum(v is not None for v in vectors)
+        metrics.inc("embedding_cache_hits_total", hits)
+        if hits:
+            print(f"✅ Embedding cache hit for {hits}/{len(batch)} chunks")
+        return [t for t, v in zip(texts, vectors) if v is None]
+
+
+class GeminiProvider(EmbeddingProvider):
+    """Gemini embeddings, sending up to 100 chunks per embed_content() call."""
+
+    name = "gemini"
+
+    def __init__(self, model_name="models/embedding-001", batch_size=EMBED_BATCH_SIZE, scheduler=None):
+        super().__init__(model_name, min(batch_size, GEMINI_MAX_BATCH), scheduler)
+
+    def make_scheduler(self, embed_fn):
+        # Remote API: keep EMBED_CONCURRENCY requests in flight within the RPM/TPM budget
+        return EmbeddingScheduler(embed_fn)
+
+    def embed_batch(self, texts, task_type="retrieval_document"):
+        result = registry.get("genai").embed_content(model=self.model_name, content=list(texts), task_type=task_type)
+        embeddings = result.get("embedding") or []
+        return [np.asarray(e, dtype=np.float32) for e in embeddings]
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """
+    Local sentence-transformers model.
+
+    `backend` selects the inference engine (torch, int8 or onnx); see
+    LOCAL_EMBED_BACKEND. torch uses the default device (GPU when available);
+    int8 and onnx run on CPU. Each batch is encoded in length-sorted passes of
+    `bucket_size` texts so short chunks are not padded to the longest one.
+    """
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", batch_size=LOCAL_EMBED_BATCH_SIZE, scheduler=None,
+                 backend=LOCAL_EMBED_BACKEND, threads=LOCAL_EMBED_THREADS, bucket_size=LOCAL_BUCKET_SIZE):
+        super().__init__(model_name, batch_size, scheduler)
+        self.backend = backend
+        self.threads = threads
+        self.bucket_size = max(1, bucket_size)
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_model(self):
+        """int8 and ONNX vectors differ slightly from fp32 ones, so each engine has its own cache entries."""
+        if self.backend == "onnx":
+            self.model  # resolves a fallback to torch before any key is made
+        if self.backend == "int8":
+            return f"{self.model_name}@int8"
+        if self.backend == "onnx":
+            return f"{self.model_name}@onnx:{LOCAL_ONNX_FILE or 'model.onnx'}"
+        return self.model_name
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.backend not in ("torch", "int8", "onnx"):
+            raise ValueError(f"Unknown LOCAL_EMBED_BACKEND: {self.backend}")
+        if self.backend == "onnx":
+            try:
+                return SentenceTransformer(self.model_name, device="cpu", backend="onnx",
+                                           model_kwargs=self._onnx_kwargs())
+            except Exception as e:
+                print(f"⚠️ ONNX backend unavailable ({e}); using torch")
+                self.backend = "torch"
+
+        import torch
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.backend == "int8":
+            # Dynamic quantization only runs on CPU
+            model = SentenceTransformer(self.model_name, device="cpu")
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            model = SentenceTransformer(self.model_name)
+        return model.eval()
+
+    def _onnx_kwargs(self):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        kwargs = {"provider": "CPUExecutionProvider", "session_options": options}
+        if LOCAL_ONNX_FILE:
+            kwargs["file_name"] = LOCAL_ONNX_FILE
+        return kwargs
+
+    def embed_batch(self, texts, task_type="retrieval_document"):
+        vectors = self.model.encode(list(texts), batch_size=self.bucket_size, convert_to_numpy=True)
+        return list(vectors.astype(np.float32, copy=False))
+
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    SentenceTransformerProvider.name: SentenceTransformerProvider,
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name, model_name=None):
+    """
+    Return a shared provider instance for `name` (and optional model).
+    EMBED_PROVIDER, when set, replaces the requested provider and model.
+    """
+    if EMBED_PROVIDER:
+        name, model_name = EMBED_PROVIDER, None
+    key = (name, model_name)
+    if key not in _providers:
+        with _providers_lock:
+            if key not in _providers:
+                if name == "fake":
+                    from backend.fake_models import FakeEmbeddingProvider
+                    cls = FakeEmbeddingProvider
+                else:
+                    cls = PROVIDERS[name]
+                _providers[key] = cls(model_name) if model_name else cls()
+    return _providers[key]
@@ -1,59 +1,48 @@
-import os
-import google.generativeai as genai
-from backend.db import insert_embedding
-from dotenv import load_dotenv
-
-# ✅ Load environment variables
-load_dotenv()
-
-# ✅ Configure Gemini Embedding Model
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from backend import metrics
+from backend.db import insert_embeddings_bulk
+from backend.embedding_provider import get_provider
+from backend.chunking import chunk_segments, report_progress, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
 
 # Model for embeddings
 EMBED_MODEL = "models/embedding-001"
 
 
-def chunk_text(text, chunk_size=500):
+def chunk_text(text, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
     """
     Split long text into smaller chunks for embeddings.
-    Uses word-based splitting for better context preservation.
+    Chunks are token-budgeted, overlap slightly and end on sentence/heading
+    boundaries. `text` may be a string or a stream of (text, meta) segments;
+    yields (chunk_text, meta) with the chunk's page/slide/timestamp span.
     """
-    words = text.split()
-    for i in range(0, len(words), chunk_size):
-        yield " ".join(words[i:i + chunk_size])
+    return chunk_segments([(text, {})] if isinstance(text, str) else text, max_tokens, overlap)
 
 
-def create_embeddings(doc_id, text):
+def create_embeddings(doc_id, text, progress=None):
     """
     Generate embeddings for text chunks and store them in MySQL.
+    `text` may be a string or a stream of text segments from the extractors.
     """
     print(f"🔍 Creating embeddings for document: {doc_id}")
 
     # Safety: skip if empty text
-    if not text or len(text.strip()) == 0:
+    if not text or (isinstance(text, str) and len(text.strip()) == 0):
         print("⚠️ Skipping empty text for embedding generation.")
-        return
+        return 0
 
     try:
-        for i, chunk in enumerate(chunk_text(text)):
-            if not chunk.strip():
-                continue
-
-            # 🔹 Generate Gemini embedding
-            result = genai.embed_content(
-                model=EMBED_MODEL,
-                content=chunk,
-                task_type="retrieval_document"  # improves search results
-            )
-
-            embedding = result.get("embedding")
-            if embedding:
-                insert_embedding(doc_id, i, chunk, embedding)
-                print(f"✅ Inserted embedding chunk {i} for {doc_id}")
-            else:
-                print(f"⚠️ Empty embedding returned for chunk {i}")
-
-        print(f"✅ All embeddings stored for document: {doc_id}")
+        # 🔹 Embed batches concurrently and stream them into one bulk transaction
+        provider = get_provider("gemini", EMBED_MODEL)
+        chunks = metrics.timed_iter(chunk_text(text), "chunk")
+        if progress:
+            chunks = report_progress(chunks, progress, "chunking", "chunked")
+        rows = metrics.timed_iter(provider.embed_chunks((i, chunk, meta) for i, (chunk, meta) in enumerate(chunks)), "embed")
+        if progress:
+            rows = report_progress(rows, progress, "embedding", "embedded")
+        with metrics.span("store_embeddings"):
+            inserted = insert_embeddings_bulk(doc_id, rows)
+        print(f"✅ All embeddings stored for document: {doc_id} ({inserted} chunks)")
+        return inserted
 
     except Exception as e:
         print(f"❌ Embedding generation failed for {doc_id}: {e}")
+        return 0
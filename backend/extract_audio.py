@@ -1,16 +1,232 @@
 import os
-import tempfile
-import whisper
-from moviepy.editor import VideoFileClip
+import shutil
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
 
-# ✅ Load Whisper model only once (to save load time)
-try:
-    print("🔊 Loading Whisper model...")
-    model = whisper.load_model("base")
-    print("✅ Whisper model loaded successfully.")
-except Exception as e:
-    print(f"❌ Failed to load Whisper model: {e}")
-    model = None
+# Whisper checkpoint: tiny | base | small | medium | large
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+# Transcription processes for long recordings (each holds its own model copy)
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Longest segment handed to one worker; cuts are placed at the quietest point
+# in the last part of each window
+SEGMENT_MAX_SECONDS = float(os.getenv("WHISPER_SEGMENT_SECONDS", "120"))
+# Recordings shorter than this are transcribed in-process on one model
+PARALLEL_MIN_SECONDS = float(os.getenv("WHISPER_PARALLEL_MIN_SECONDS", "300"))
+
+# Seconds of decoded audio held in memory at once when streaming a file
+DECODE_WINDOW_SECONDS = float(os.getenv("AUDIO_DECODE_WINDOW_SECONDS", "600"))
+
+SAMPLE_RATE = 16000  # whisper.audio.SAMPLE_RATE
+FRAME_SECONDS = 0.03
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Load the Whisper model on first use (not at import time)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import whisper
+                print(f"🔊 Loading Whisper model '{WHISPER_MODEL}'...")
+                _model = whisper.load_model(WHISPER_MODEL)
+                print("✅ Whisper model loaded successfully.")
+    return _model
+
+
+def split_on_silence(audio, sample_rate=SAMPLE_RATE, max_seconds=SEGMENT_MAX_SECONDS, search_fraction=0.3):
+    """
+    Split a mono waveform into (start, end) sample ranges of at most
+    `max_seconds`. Each cut is placed at the quietest frame within the last
+    `search_fraction` of the window, so words are not split mid-utterance.
+    """
+    total = len(audio)
+    max_len = int(max_seconds * sample_rate)
+    if total <= max_len:
+        return [(0, total)]
+
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    n_frames = total // frame
+    rms = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+
+    bounds, start = [], 0
+    while total - start > max_len:
+        limit = start + max_len
+        lo = (start + int(max_len * (1 - search_fraction))) // frame
+        hi = min(limit // frame, n_frames)
+        cut = (lo + int(np.argmin(rms[lo:hi]))) * frame if hi > lo else limit
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, total))
+    return bounds
+
+
+def _transcribe_array(model, audio, offset_seconds=0.0):
+    """Transcribe a waveform and return [(start, end, text)] with absolute timestamps."""
+    result = model.transcribe(audio, fp16=False)
+    return [
+        (offset_seconds + seg["start"], offset_seconds + seg["end"], seg["text"].strip())
+        for seg in result.get("segments", [])
+        if seg.get("text", "").strip()
+    ]
+
+
+def _init_worker(model_name, threads):
+    global WHISPER_MODEL
+    import torch
+    torch.set_num_threads(threads)
+    WHISPER_MODEL = model_name
+    get_model()
+
+
+def _transcribe_worker(audio, offset_seconds):
+    return _transcribe_array(get_model(), audio, offset_seconds)
+
+
+class _Transcriber:
+    """
+    Transcribes waveforms, in-process for short audio or across a process
+    pool for long audio. The pool is created on first need and reused for
+    every window of a long stream, so worker models load only once. Workers
+    are spawned, not forked: the pool is created from job-queue threads, and
+    a forked child could inherit locks held by other threads. Spawned workers
+    import the entry script as __mp_main__, so its startup must sit behind
+    `if __name__ == "__main__"` (as in app.py).
+    """
+
+    def __init__(self, workers=WHISPER_WORKERS):
+        self.workers = workers
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or self.workers) // self.workers)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=(WHISPER_MODEL, threads))
+        return self._pool
+
+    def transcribe(self, audio, offset_seconds=0.0):
+        duration = len(audio) / SAMPLE_RATE
+        bounds = split_on_silence(audio)
+        if self.workers <= 1 or len(bounds) == 1 or duration < PARALLEL_MIN_SECONDS:
+            segments = []
+            for start, end in bounds:
+                segments.extend(_transcribe_array(get_model(), audio[start:end], offset_seconds + start / SAMPLE_RATE))
+            return segments
+
+        print(f"🎧 Transcribing {duration:.0f}s of audio as {len(bounds)} segments on {self.workers} workers")
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_transcribe_worker, audio[start:end], offset_seconds + start / SAMPLE_RATE)
+            for start, end in bounds
+        ]
+        segments = []
+        for future in futures:
+            segments.extend(future.result())
+        return segments
+
+
+def transcribe_waveform(audio, workers=WHISPER_WORKERS):
+    """
+    Transcribe a 16 kHz mono float32 waveform. Long recordings are split on
+    silence and the pieces are transcribed in parallel across a process
+    pool, then stitched back in time order.
+    Returns a list of (start_seconds, end_seconds, text).
+    """
+    with _Transcriber(workers) as transcriber:
+        return transcriber.transcribe(audio)
+
+
+def _ffmpeg_exe():
+    """Locate ffmpeg: $FFMPEG_BINARY, then PATH, then the imageio-ffmpeg bundle."""
+    exe = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+    if exe:
+        return exe
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def iter_pcm_windows(file_path, window_seconds=DECODE_WINDOW_SECONDS):
+    """
+    Decode only the audio stream of any media file straight to 16 kHz mono
+    float32 NumPy arrays, yielded `window_seconds` at a time from an ffmpeg
+    pipe. Nothing is written to disk and memory is bounded by the window.
+    """
+    cmd = [
+        _ffmpeg_exe(), "-nostdin", "-loglevel", "error",
+        "-i", file_path, "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "f32le", "-",
+    ]
+    window_bytes = int(window_seconds * SAMPLE_RATE) * 4
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = proc.stdout.read(window_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % 4
+            if usable:
+                yield np.frombuffer(data[:usable], dtype=np.float32)
+        error = proc.stderr.read().decode(errors="ignore").strip()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {file_path}: {error}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def iter_media_segments(file_path: str, window_seconds=DECODE_WINDOW_SECONDS):
+    """
+    Yield (text, {"start": s, "end": e}) transcript segments for an audio or
+    video file, with timestamps in seconds from the start of the recording.
+
+    Audio is decoded window by window; the tail after the last silence cut of
+    each window is carried into the next one so no cut lands mid-speech.
+    """
+    carry = np.empty(0, dtype=np.float32)
+    offset = 0  # sample offset of `carry` within the recording
+    with _Transcriber() as transcriber:
+        for window in iter_pcm_windows(file_path, window_seconds):
+            audio = np.concatenate((carry, window)) if len(carry) else window
+            bounds = split_on_silence(audio)
+            if len(bounds) == 1:
+                carry = audio
+                continue
+            cut = bounds[-1][0]
+            for start, end, text in transcriber.transcribe(audio[:cut], offset / SAMPLE_RATE):
+                yield text, {"start": round(start, 2), "end": round(end, 2)}
+            carry = audio[cut:]
+            offset += cut
+        if len(carry):
+            for start, end, text in transcriber.transcribe(carry, offset / SAMPLE_RATE):
+                yield text, {"start": round(start, 2), "end": round(end, 2)}
+
+
+def iter_audio_segments(file_path: str):
+    """Yield timestamped transcript segments for an audio file (.mp3, .wav)."""
+    print(f"🎧 Transcribing audio: {file_path}")
+    yield from iter_media_segments(file_path)
+
+
+def iter_video_segments(file_path: str):
+    """Yield timestamped transcript segments for a video's audio track."""
+    print(f"🎥 Transcribing audio track of video: {file_path}")
+    yield from iter_media_segments(file_path)
 
 
 def extract_from_audio(file_path: str) -> str:
@@ -18,14 +234,8 @@ def extract_from_audio(file_path: str) -> str:
     Transcribe audio file (.mp3, .wav) using Whisper.
     Returns extracted text.
     """
-    if model is None:
-        print("❌ Whisper model not available.")
-        return None
-
     try:
-        print(f"🎧 Transcribing audio: {file_path}")
-        result = model.transcribe(file_path)
-        text = result.get("text", "").strip()
+        text = " ".join(text for text, _ in iter_audio_segments(file_path)).strip()
         if not text:
             print("⚠️ No speech detected in audio.")
             return None
@@ -40,33 +250,15 @@ def extract_from_video(file_path: str) -> str:
     """
     Extracts audio from a video file and transcribes it.
     Supported formats: .mp4, .mov, .avi
+    The audio stream is decoded in memory; no temporary file is written.
     """
-    if model is None:
-        print("❌ Whisper model not available.")
-        return None
-
     try:
-        print(f"🎥 Extracting audio from video: {file_path}")
-
-        # Create a temporary audio file
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_audio:
-            audio_path = tmp_audio.name
-
-        # Extract audio
-        clip = VideoFileClip(file_path)
-        clip.audio.write_audiofile(audio_path, verbose=False, logger=None)
-        clip.close()
-
-        # Transcribe extracted audio
-        text = extract_from_audio(audio_path)
-
-        # Clean up
-        os.remove(audio_path)
-
+        text = " ".join(text for text, _ in iter_video_segments(file_path)).strip()
         if text:
             print("✅ Video transcription successful.")
         else:
             print("⚠️ No transcribable audio found in video.")
+            return None
         return text
 
     except Exception as e:
@@ -1,15 +1,97 @@
-import pytesseract
-from PIL import Image
 import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+
+# Longest image side fed to Tesseract; larger scans are downscaled first
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "3000"))
+# Parallel Tesseract processes for batches of images / scanned pages
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+
+# Default install locations checked when tesseract is not on PATH
+_TESSERACT_CANDIDATES = [
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+    "/usr/bin/tesseract",
+    "/usr/local/bin/tesseract",
+    "/opt/homebrew/bin/tesseract",
+]
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def find_tesseract():
+    """Locate the tesseract binary: $TESSERACT_CMD, then PATH, then common install paths."""
+    candidates = [os.getenv("TESSERACT_CMD"), shutil.which("tesseract"), *_TESSERACT_CANDIDATES]
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _configure():
+    global _configured
+    if not _configured:
+        with _configure_lock:
+            if not _configured:
+                cmd = find_tesseract()
+                if cmd is None:
+                    raise RuntimeError("Tesseract not found; install it or set TESSERACT_CMD")
+                import pytesseract
+                pytesseract.pytesseract.tesseract_cmd = cmd
+                # One thread per tesseract process; parallelism comes from the pool
+                os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+                _configured = True
+
+
+def _otsu_threshold(gray):
+    """
+    Otsu's threshold for an 8-bit grayscale array. A uniform image (e.g. a
+    blank page) has no two classes to separate and gets the midpoint.
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    if np.count_nonzero(hist) < 2:
+        return 127
+    total = hist.sum()
+    weight_bg = np.cumsum(hist)
+    mean_bg = np.cumsum(hist * np.arange(256))
+    weight_fg = total - weight_bg
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean_bg[-1] * weight_bg - mean_bg * total) ** 2 / (weight_bg * weight_fg)
+    return int(np.nanargmax(between))
+
+
+def preprocess(image, max_side=OCR_MAX_SIDE):
+    """
+    Prepare an image for OCR: grayscale, downscale so the longest side is at
+    most `max_side`, stretch contrast, then binarize with Otsu's threshold.
+    """
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(image).convert("L")
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image = ImageOps.autocontrast(image)
+    gray = np.asarray(image)
+    threshold = _otsu_threshold(gray)
+    return Image.fromarray(np.where(gray > threshold, 255, 0).astype(np.uint8))
+
+
+def ocr_image(image, lang="eng"):
+    """Run Tesseract on a PIL image after preprocessing."""
+    import pytesseract
+
+    _configure()
+    return pytesseract.image_to_string(preprocess(image), lang=lang).strip()
 
-# ✅ Path to your local Tesseract installation
-# Make sure this matches your system path
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 def extract_from_image(file_path, lang="eng"):
     """
     Extracts text from an image using Tesseract OCR.
-    
+
     Args:
         file_path (str): Path to the image file.
         lang (str): Language code for OCR (default: English).
@@ -22,9 +104,24 @@ def extract_from_image(file_path, lang="eng"):
         return ""
 
     try:
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image, lang=lang)
-        return text.strip()
+        from PIL import Image
+
+        with Image.open(file_path) as image:
+            return ocr_image(image, lang=lang)
     except Exception as e:
         print(f"❌ Failed to extract text from image: {e}")
         return ""
+
+
+def ocr_images(images, lang="eng", workers=OCR_WORKERS):
+    """
+    OCR a batch of PIL images across a worker pool. Tesseract runs as a
+    subprocess, so threads are enough to use every core.
+    Returns texts in input order.
+    """
+    images = list(images)
+    if len(images) <= 1 or workers <= 1:
+        return [ocr_image(image, lang) for image in images]
+    with ThreadPoolExecutor(max_workers=min(workers, len(images))) as pool:
+        return list(pool.map(lambda image: ocr_image(image, lang), images))
+
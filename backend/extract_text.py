@@ -1,17 +1,120 @@
-import fitz  # PyMuPDF
-from docx import Document
-from pptx import Presentation
-import markdown
 import os
+import backend.config  # noqa: F401  (loads .env)
+from backend.extract_image import extract_from_image, ocr_images
+
+# Parsers (PyMuPDF, python-docx, python-pptx, markdown, Pillow) are imported
+# inside the functions that use them, so importing this module stays cheap.
+
+# Target size of the text blocks yielded for plain-text files
+TEXT_BLOCK_CHARS = 64 * 1024
+
+# OCR pages that have no text layer (scanned PDFs); set PDF_OCR_FALLBACK=0 to skip
+PDF_OCR_FALLBACK = os.getenv("PDF_OCR_FALLBACK", "1") != "0"
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+# Pages with fewer extractable characters than this are treated as scanned
+OCR_MIN_CHARS = 16
+# Scanned pages rendered and OCR'd together (bounds memory for rendered images)
+OCR_WINDOW_PAGES = 16
+
+
+# ---------- Streaming extractors ----------
+# Each yields (text, meta) segments one page / paragraph / slide / block at a
+# time, so callers never need the whole document in memory.
+
+def _render_page(page, dpi=OCR_DPI):
+    """Render a PDF page to a grayscale PIL image for OCR."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+
+def _ocr_window(window):
+    """Yield a window of pages in order, OCR-ing the scanned ones in parallel."""
+    scanned = [(number, image) for number, _, image in window if image is not None]
+    ocr_text = {}
+    if scanned:
+        try:
+            texts = ocr_images([image for _, image in scanned])
+            ocr_text = {number: text for (number, _), text in zip(scanned, texts)}
+        except Exception as e:
+            print(f"⚠️ OCR fallback failed, keeping the text layer: {e}")
+    for number, text, _ in window:
+        if number in ocr_text:
+            yield ocr_text[number], {"page": number, "ocr": True}
+        else:
+            yield text, {"page": number}
+
+
+def iter_pdf_pages(file_path, ocr=PDF_OCR_FALLBACK):
+    """
+    Yield (text, {"page": n}) for every page of a PDF. Pages without a text
+    layer but with embedded images are rendered and OCR'd, a window of
+    pages at a time across the OCR worker pool.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as pdf:
+        window = []
+        for number, page in enumerate(pdf, start=1):
+            text = page.get_text("text")
+            image = None
+            if ocr and len(text.strip()) < OCR_MIN_CHARS and page.get_images():
+                image = _render_page(page)
+            window.append((number, text, image))
+            if len(window) >= OCR_WINDOW_PAGES:
+                yield from _ocr_window(window)
+                window = []
+        yield from _ocr_window(window)
+
+
+def iter_docx_paragraphs(file_path):
+    """
+    Yield (text, {"paragraph": n}) for every non-empty DOCX paragraph;
+    paragraphs in a Heading or Title style also carry "heading": True.
+    """
+    from docx import Document
+
+    doc = Document(file_path)
+    for number, paragraph in enumerate(doc.paragraphs, start=1):
+        if paragraph.text.strip():
+            style = paragraph.style.name if paragraph.style is not None else ""
+            if style.startswith(("Heading", "Title")):
+                yield paragraph.text, {"paragraph": number, "heading": True}
+            else:
+                yield paragraph.text, {"paragraph": number}
+
+
+def iter_pptx_slides(file_path):
+    """Yield (text, {"slide": n}) with the text of all shapes on each slide."""
+    from pptx import Presentation
+
+    prs = Presentation(file_path)
+    for number, slide in enumerate(prs.slides, start=1):
+        texts = [shape.text for shape in slide.shapes if hasattr(shape, "text")]
+        if texts:
+            yield "\n".join(texts), {"slide": number}
+
+
+def iter_txt_blocks(file_path, block_chars=TEXT_BLOCK_CHARS):
+    """Yield (text, {"line": first_line}) blocks of whole lines from a text file."""
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        lines, size, first_line = [], 0, 1
+        for number, line in enumerate(f, start=1):
+            lines.append(line)
+            size += len(line)
+            if size >= block_chars:
+                yield "".join(lines), {"line": first_line}
+                lines, size, first_line = [], 0, number + 1
+        if lines:
+            yield "".join(lines), {"line": first_line}
+
 
 def extract_from_pdf(file_path):
     """Extract text from PDF using PyMuPDF."""
     try:
-        text = ""
-        with fitz.open(file_path) as pdf:
-            for page in pdf:
-                text += page.get_text()
-        return text.strip()
+        return "".join(text for text, _ in iter_pdf_pages(file_path)).strip()
     except Exception as e:
         print(f"❌ Error extracting from PDF: {e}")
         return ""
@@ -19,8 +122,7 @@ def extract_from_pdf(file_path):
 def extract_from_docx(file_path):
     """Extract text from DOCX files."""
     try:
-        doc = Document(file_path)
-        return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+        return "\n".join(text for text, _ in iter_docx_paragraphs(file_path))
     except Exception as e:
         print(f"❌ Error extracting from DOCX: {e}")
         return ""
@@ -28,13 +130,7 @@ def extract_from_docx(file_path):
 def extract_from_pptx(file_path):
     """Extract text from PowerPoint slides."""
     try:
-        prs = Presentation(file_path)
-        text = ""
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
-        return text.strip()
+        return "\n".join(text for text, _ in iter_pptx_slides(file_path)).strip()
     except Exception as e:
         print(f"❌ Error extracting from PPTX: {e}")
         return ""
@@ -53,6 +149,8 @@ def extract_from_md(file_path):
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             md_content = f.read()
+        import markdown
+
         html_text = markdown.markdown(md_content)
         return html_text.strip()
     except Exception as e:
@@ -73,8 +171,31 @@ def extract_text(file_path):
             return extract_from_txt(file_path)
         elif ext == ".md":
             return extract_from_md(file_path)
+        elif ext in (".png", ".jpg", ".jpeg"):
+            return extract_from_image(file_path)
         else:
             raise ValueError(f"Unsupported file type: {ext}")
     except Exception as e:
         print(f"❌ Extraction failed: {e}")
         return ""
+
+
+def extract_segments(file_path):
+    """
+    Like extract_text, but returns a list of (text, meta) segments so the
+    chunker can record page/slide/line provenance. Used by bulk ingestion.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext == ".pdf":
+            return list(iter_pdf_pages(file_path))
+        elif ext == ".docx":
+            return list(iter_docx_paragraphs(file_path))
+        elif ext == ".pptx":
+            return list(iter_pptx_slides(file_path))
+        elif ext == ".txt":
+            return list(iter_txt_blocks(file_path))
+        return [(extract_text(file_path), {})]
+    except Exception as e:
+        print(f"❌ Extraction failed: {e}")
+        return []
@@ -0,0 +1,97 @@
+import os
+import re
+import time
+import hashlib
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+from backend.embedding_provider import EmbeddingProvider
+
+# Simulated latency of the fake generator (milliseconds)
+FAKE_FIRST_TOKEN_MS = float(os.getenv("FAKE_FIRST_TOKEN_MS", "300"))
+FAKE_TOKEN_MS = float(os.getenv("FAKE_TOKEN_MS", "20"))
+# Dimension and simulated per-batch latency of the fake embedder
+FAKE_EMBED_DIM = int(os.getenv("FAKE_EMBED_DIM", "768"))
+FAKE_EMBED_MS = float(os.getenv("FAKE_EMBED_MS", "0"))
+
+_WORD = re.compile(r"\w+")
+
+
+class _FakeResponse:
+    """Mimics the .text attribute of a Gemini response / stream chunk."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamingModel:
+    """
+    Local stand-in for genai.GenerativeModel with realistic timing: waits
+    `first_token_ms` before the first chunk and `token_ms` between chunks of
+    `words_per_chunk` words. Use GENERATION_MODEL=fake to run the app, or a
+    latency measurement, without calling Gemini.
+    """
+
+    def __init__(self, answer=None, first_token_ms=FAKE_FIRST_TOKEN_MS, token_ms=FAKE_TOKEN_MS, words_per_chunk=3):
+        self.answer = answer
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.words_per_chunk = words_per_chunk
+
+    def _answer_for(self, prompt):
+        if self.answer is not None:
+            return self.answer
+        return (f"This is a fake answer generated locally from a {len(prompt)}-character prompt. "
+                "It streams a few words at a time so time-to-first-token can be measured "
+                "without calling the Gemini API.")
+
+    def _stream(self, text):
+        words = text.split(" ")
+        time.sleep(self.first_token_ms / 1000)
+        for start in range(0, len(words), self.words_per_chunk):
+            if start:
+                time.sleep(self.token_ms / 1000)
+            piece = " ".join(words[start:start + self.words_per_chunk])
+            yield _FakeResponse(piece if start == 0 else " " + piece)
+
+    def generate_content(self, prompt, stream=False):
+        chunks = self._stream(self._answer_for(prompt))
+        if stream:
+            return chunks
+        return _FakeResponse("".join(chunk.text for chunk in chunks))
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic local embedder for benchmarks and offline runs
+    (EMBED_PROVIDER=fake). Each word is hashed to a fixed signed dimension
+    and the counts are L2-normalized, so texts sharing words are similar and
+    the same text gives the same vector in every process.
+    """
+
+    name = "fake"
+
+    def __init__(self, model_name="fake-embedding", dim=FAKE_EMBED_DIM, batch_ms=FAKE_EMBED_MS, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.dim = dim
+        self.batch_ms = batch_ms
+        self._buckets = {}
+
+    def _bucket(self, word):
+        bucket = self._buckets.get(word)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = self._buckets[word] = (digest % self.dim, 1.0 if digest >> 63 else -1.0)
+        return bucket
+
+    def embed_batch(self, texts, task_type="retrieval_document"):
+        if self.batch_ms:
+            time.sleep(self.batch_ms / 1000)
+        vectors = []
+        for text in texts:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in _WORD.findall(text.lower()):
+                position, sign = self._bucket(word)
+                vector[position] += sign
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
@@ -1,19 +1,33 @@
-from sentence_transformers import SentenceTransformer
-from backend.db import insert_embedding
+from backend import metrics
+from backend.db import insert_embeddings_bulk
+from backend.embedding_provider import get_provider
+from backend.chunking import chunk_segments, report_progress, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
 
-model = SentenceTransformer('all-MiniLM-L6-v2')  # Fast, reliable
+LOCAL_MODEL = 'all-MiniLM-L6-v2'  # Fast, reliable
+# all-MiniLM-L6-v2 truncates input at 256 word pieces; leave headroom for tokenizer differences
+LOCAL_CHUNK_TOKENS = min(CHUNK_TOKENS, 224)
 
-def chunk_text(text, chunk_size=500):
-    words = text.split()
-    for i in range(0, len(words), chunk_size):
-        yield " ".join(words[i:i + chunk_size])
+def document_provider():
+    """The provider that embeds document chunks; search embeds queries with the same one."""
+    return get_provider("sentence-transformers", LOCAL_MODEL)
 
-def create_embeddings(doc_id, text):
+def chunk_text(text, max_tokens=LOCAL_CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS):
+    return chunk_segments([(text, {})] if isinstance(text, str) else text, max_tokens, overlap)
+
+def create_embeddings(doc_id, text, progress=None):
     print(f"🔍 Creating embeddings for document: {doc_id}")
     try:
-        for i, chunk in enumerate(chunk_text(text)):
-            embedding = model.encode(chunk).tolist()
-            insert_embedding(doc_id, i, chunk, embedding)
-        print(f"✅ All embeddings stored for {doc_id}")
+        provider = document_provider()
+        chunks = metrics.timed_iter(chunk_text(text), "chunk")
+        if progress:
+            chunks = report_progress(chunks, progress, "chunking", "chunked")
+        rows = metrics.timed_iter(provider.embed_chunks((i, chunk, meta) for i, (chunk, meta) in enumerate(chunks)), "embed")
+        if progress:
+            rows = report_progress(rows, progress, "embedding", "embedded")
+        with metrics.span("store_embeddings"):
+            inserted = insert_embeddings_bulk(doc_id, rows)
+        print(f"✅ All embeddings stored for {doc_id} ({inserted} chunks)")
+        return inserted
     except Exception as e:
         print(f"❌ Embedding generation failed: {e}")
+        return 0
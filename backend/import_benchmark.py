@@ -0,0 +1,93 @@
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+# Entry points whose import cost matters for cold start
+DEFAULT_TARGETS = ["backend.query_handler", "backend.jobs", "backend.store_data", "backend.search_engine"]
+
+# Heavy packages that must only load on first use (see backend/registry.py)
+FORBIDDEN_AT_IMPORT = [
+    "torch", "whisper", "sentence_transformers", "transformers", "google.generativeai",
+    "moviepy", "fitz", "docx", "pptx", "pytesseract", "PIL", "mysql.connector", "tiktoken",
+]
+
+# Cumulative import budget per target (milliseconds)
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import(module, cwd=None):
+    """
+    Import `module` in a fresh interpreter with `-X importtime` and parse the
+    report. Returns {"module", "total_ms", "heaviest": [(name, ms)], "loaded": set}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=cwd,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative, loaded = {}, set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            name = match.group(4)
+            cumulative[name] = int(match.group(2)) / 1000
+            loaded.add(name)
+    heaviest = sorted(
+        ((name, ms) for name, ms in cumulative.items() if not name.startswith("backend")),
+        key=lambda item: -item[1],
+    )[:10]
+    return {"module": module, "total_ms": round(cumulative.get(module, 0.0), 1), "heaviest": heaviest, "loaded": loaded}
+
+
+def check(targets=None, budget_ms=IMPORT_BUDGET_MS, cwd=None):
+    """
+    Measure every target and flag regressions: a forbidden heavy package
+    imported eagerly, or a cumulative import time over the budget.
+    Returns (report rows, list of problems).
+    """
+    rows, problems = [], []
+    for module in targets or DEFAULT_TARGETS:
+        measured = measure_import(module, cwd=cwd)
+        eager = [name for name in FORBIDDEN_AT_IMPORT if name in measured["loaded"]]
+        rows.append({
+            "module": module,
+            "total_ms": measured["total_ms"],
+            "eager_heavy_imports": eager,
+            "heaviest": [(name, round(ms, 1)) for name, ms in measured["heaviest"]],
+        })
+        if eager:
+            problems.append(f"{module} imports {', '.join(eager)} at import time")
+        if measured["total_ms"] > budget_ms:
+            problems.append(f"{module} takes {measured['total_ms']} ms to import (budget {budget_ms} ms)")
+    return rows, problems
+
+
+if __name__ == "__main__":
+    # Cold-start regression check: python -m backend.import_benchmark [modules...]
+    parser = argparse.ArgumentParser(description="Report import time of backend entry points (python -X importtime).")
+    parser.add_argument("modules", nargs="*", help=f"Modules to import (default: {' '.join(DEFAULT_TARGETS)})")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    rows, problems = check(args.modules or None, args.budget_ms, cwd=root)
+    if args.json:
+        print(json.dumps({"results": rows, "problems": problems}, indent=2))
+    else:
+        for row in rows:
+            print(f"📦 {row['module']}: {row['total_ms']} ms")
+            for name, ms in row["heaviest"][:5]:
+                print(f"    {ms:>8.1f} ms  {name}")
+        for problem in problems:
+            print(f"❌ {problem}")
+        if not problems:
+            print("✅ Import-time check passed")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import backend.config  # noqa: F401  (loads .env)
+
+# SQLite file holding the durable job table
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+
+# Worker threads per modality (audio/video transcription is the slow one)
+JOB_WORKERS = {
+    "text": int(os.getenv("JOB_WORKERS_TEXT", "4")),
+    "audio": int(os.getenv("JOB_WORKERS_AUDIO", "1")),
+    "image": int(os.getenv("JOB_WORKERS_IMAGE", "2")),
+}
+
+MODALITIES = {
+    ".mp3": "audio", ".wav": "audio", ".mp4": "audio", ".mov": "audio", ".avi": "audio",
+    ".png": "image", ".jpg": "image", ".jpeg": "image",
+}
+
+# Minimum seconds between progress writes for the same job
+PROGRESS_INTERVAL = 0.5
+
+
+def modality_of(file_path):
+    """Map a file to the worker pool that should process it."""
+    return MODALITIES.get(os.path.splitext(file_path)[1].lower(), "text")
+
+
+class JobQueue:
+    """
+    Background ingestion queue.
+
+    Jobs are recorded in a SQLite table so their status survives restarts;
+    jobs still queued or running when the process stopped are resubmitted
+    on start-up. Each modality has its own worker pool so a long
+    transcription cannot starve document uploads. A job submitted with a
+    doc_id re-ingests the file as a new version of that document.
+    """
+
+    def __init__(self, db_path=JOBS_DB_PATH, workers=None, process_fn=None):
+        self.db_path = db_path
+        self._process_fn = process_fn
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    file_path TEXT NOT NULL,
+                    modality TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress TEXT,
+                    doc_id TEXT,
+                    preview TEXT,
+                    error TEXT,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+            self._conn.commit()
+        workers = {**JOB_WORKERS, **(workers or {})}
+        self._pools = {
+            modality: ThreadPoolExecutor(max_workers=max(1, n), thread_name_prefix=f"ingest-{modality}")
+            for modality, n in workers.items()
+        }
+        self._resume()
+
+    # ---------- persistence ----------
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if unknown."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"] or "{}")
+        return job
+
+    def _resume(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, file_path, modality, doc_id FROM jobs WHERE status IN ('queued', 'running') "
+                "ORDER BY created_at"
+            ).fetchall()
+        for row in rows:
+            print(f"♻️ Resuming ingestion job {row['id']}")
+            self._update(row["id"], status="queued", stage="queued")
+            self._dispatch(row["id"], row["file_path"], row["modality"], row["doc_id"])
+
+    # ---------- execution ----------
+
+    def submit(self, file_path, doc_id=None):
+        """
+        Queue a file for ingestion and return its job id immediately. With
+        `doc_id` the file replaces that document's content (an update).
+        """
+        job_id = str(uuid.uuid4())
+        modality = modality_of(file_path)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, file_path, modality, status, stage, progress, doc_id, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', 'queued', '{}', ?, ?, ?)",
+                (job_id, file_path, modality, doc_id, now, now)
+            )
+            self._conn.commit()
+        self._dispatch(job_id, file_path, modality, doc_id)
+        return job_id
+
+    def _dispatch(self, job_id, file_path, modality, doc_id=None):
+        pool = self._pools.get(modality) or self._pools["text"]
+        pool.submit(self._run, job_id, file_path, doc_id)
+
+    def _run(self, job_id, file_path, doc_id=None):
+        process_fn = self._process_fn
+        if doc_id:
+            from backend.store_data import update_document
+            process_fn = partial(update_document, doc_id)
+        elif process_fn is None:
+            from backend.store_data import process_and_store as process_fn
+
+        self._update(job_id, status="running", stage="extracting")
+        progress = {}
+        last_write = [0.0]
+
+        def report(stage, **counts):
+            progress.update(counts)
+            now = time.time()
+            if now - last_write[0] >= PROGRESS_INTERVAL or stage == "stored":
+                last_write[0] = now
+                self._update(job_id, stage=stage, progress=json.dumps(progress))
+
+        try:
+            doc_id, preview = process_fn(file_path, progress=report)
+        except Exception as e:
+            print(f"❌ Ingestion job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e))
+            return
+
+        if doc_id:
+            self._update(job_id, status="done", stage="stored", doc_id=doc_id,
+                         preview=preview, progress=json.dumps(progress))
+            print(f"✅ Ingestion job {job_id} finished (document {doc_id})")
+        else:
+            self._update(job_id, status="failed", error="Failed to process file")
+
+    def shutdown(self, wait=True):
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue, creating it (and resuming jobs) on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
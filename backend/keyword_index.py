@@ -0,0 +1,199 @@
+import os
+import re
+import math
+import threading
+from array import array
+from collections import Counter
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+from backend.vector_index import _pack_strings, _unpack_strings
+
+# BM25 parameters: term-frequency saturation and document-length normalization
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Words, plus identifiers joined by - . / : (part numbers, error codes, versions)
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_SEPARATORS = re.compile(r"[-./:_]+")
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens. Compound identifiers such as "XJ-2000" or
+    "v1.2.3" are kept whole and also indexed by their parts, so both an
+    exact identifier and a fragment of it match.
+    """
+    for token in _TOKEN.findall((text or "").lower()):
+        yield token
+        if not token.isalnum():
+            for part in _SEPARATORS.split(token):
+                if part and part != token:
+                    yield part
+
+
+class KeywordIndex:
+    """
+    Incremental BM25 inverted index over chunk texts.
+
+    Rows are numbered in insertion order and line up one-to-one with the rows
+    of the VectorIndex they are built alongside, so a hit is resolved to its
+    chunk id, document and text through the vector index. Postings are
+    append-only int32 arrays per term, so adding a chunk never rewrites
+    existing postings. Removed rows are tombstoned like VectorIndex rows:
+    they stay in the postings but leave the corpus statistics (row count,
+    average length, document frequencies), are skipped at query time and
+    are dropped on serialization.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> (rows, term frequencies)
+        self._lengths = array("i")
+        self._lengths_np = None
+        self._total_length = 0
+        self._deleted = bytearray()
+        self._deleted_count = 0
+        self._df_removed = Counter()  # term -> tombstoned rows still in its posting
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    @property
+    def live_count(self):
+        return len(self._lengths) - self._deleted_count
+
+    def add(self, texts):
+        """Index texts as the next rows. Returns the number of rows added."""
+        added = 0
+        with self._lock:
+            for text in texts:
+                row = len(self._lengths)
+                counts = Counter(tokenize(text))
+                for term, tf in counts.items():
+                    posting = self._postings.get(term)
+                    if posting is None:
+                        posting = self._postings[term] = (array("i"), array("i"))
+                    posting[0].append(row)
+                    posting[1].append(tf)
+                length = sum(counts.values())
+                self._lengths.append(length)
+                self._deleted.append(0)
+                self._total_length += length
+                added += 1
+            self._lengths_np = None
+        return added
+
+    def remove(self, rows, texts):
+        """
+        Tombstone rows, given with the texts they were indexed from (their
+        terms leave the document frequencies). Returns the number removed.
+        """
+        removed = 0
+        with self._lock:
+            for row, text in zip(rows, texts):
+                row = int(row)
+                if row >= len(self._lengths) or self._deleted[row]:
+                    continue
+                self._deleted[row] = 1
+                self._deleted_count += 1
+                self._total_length -= self._lengths[row]
+                self._df_removed.update(set(tokenize(text)))
+                removed += 1
+        return removed
+
+    def search(self, query, top_k=5, rows=None):
+        """
+        Return up to top_k (row, score) pairs for the query, best first.
+        `rows` (sorted row positions) restricts the postings before scoring;
+        removed rows are never returned.
+        """
+        terms = set(tokenize(query))
+        allowed = rows
+        with self._lock:
+            n = self.live_count
+            if n == 0 or top_k <= 0 or not terms:
+                return []
+            if self._lengths_np is None:
+                self._lengths_np = np.array(self._lengths, dtype=np.float32)
+            avg_length = self._total_length / n or 1.0
+
+            rows_parts, score_parts = [], []
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                rows = np.array(posting[0], dtype=np.int64)
+                tfs = np.array(posting[1], dtype=np.float32)
+                df = len(rows) - self._df_removed.get(term, 0)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                if allowed is not None:
+                    keep = np.isin(rows, allowed, assume_unique=True)
+                    rows, tfs = rows[keep], tfs[keep]
+                norm = self.k1 * (1 - self.b + self.b * self._lengths_np[rows] / avg_length)
+                rows_parts.append(rows)
+                score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+            deleted = np.frombuffer(bytes(self._deleted), dtype=bool) if self._deleted_count else None
+        if not rows_parts:
+            return []
+
+        # Sum per-term contributions over the candidate rows only
+        candidates, inverse = np.unique(np.concatenate(rows_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if deleted is not None:
+            keep = ~deleted[candidates]
+            candidates, scores = candidates[keep], scores[keep]
+        k = min(top_k, len(candidates))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(candidates[t]), float(scores[t])) for t in top]
+
+    def to_arrays(self, keep=None):
+        """
+        Serialize the postings as CSR-style arrays (prefixed "bm25_"). With a
+        boolean `keep` mask only those rows are written, renumbered in order,
+        matching VectorIndex.to_arrays(); by default the live rows are.
+        """
+        with self._lock:
+            lengths = np.array(self._lengths, dtype=np.int32)
+            if keep is None:
+                keep = np.frombuffer(bytes(self._deleted), dtype=bool) == 0
+            renumber = np.cumsum(keep, dtype=np.int64) - 1
+            terms, row_parts, tf_parts = [], [], []
+            for term, (rows, tfs) in self._postings.items():
+                rows = np.frombuffer(rows, dtype=np.int32)
+                live = keep[rows]
+                if not live.any():
+                    continue
+                terms.append(term)
+                row_parts.append(renumber[rows[live]].astype(np.int32))
+                tf_parts.append(np.frombuffer(tfs, dtype=np.int32)[live])
+            term_blob, term_offsets = _pack_strings(terms)
+            return {
+                "bm25_term_blob": term_blob,
+                "bm25_term_offsets": term_offsets,
+                "bm25_posting_offsets": np.cumsum([len(r) for r in row_parts], dtype=np.int64),
+                "bm25_rows": np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int32),
+                "bm25_tfs": np.concatenate(tf_parts) if tf_parts else np.empty(0, dtype=np.int32),
+                "bm25_lengths": lengths[keep],
+            }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild an index from to_arrays() output, or None if it is absent."""
+        if "bm25_lengths" not in arrays:
+            return None
+        index = cls()
+        terms = _unpack_strings(arrays["bm25_term_blob"], arrays["bm25_term_offsets"])
+        rows, tfs = arrays["bm25_rows"], arrays["bm25_tfs"]
+        start = 0
+        for term, end in zip(terms, arrays["bm25_posting_offsets"]):
+            index._postings[term] = (array("i", rows[start:end].tobytes()), array("i", tfs[start:end].tobytes()))
+            start = end
+        index._lengths = array("i", arrays["bm25_lengths"].astype(np.int32).tobytes())
+        index._deleted = bytearray(len(index._lengths))
+        index._total_length = int(arrays["bm25_lengths"].sum())
+        return index
@@ -0,0 +1,197 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+import backend.config  # noqa: F401  (loads .env)
+
+# Prefix of every exported metric name
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "mka")
+# Histogram bucket upper bounds (seconds)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Help text and type of each metric (name without prefix)
+METRICS = {
+    "stage_seconds": ("histogram", "Time spent in a pipeline stage per request, excluding nested stages"),
+    "request_seconds": ("histogram", "End-to-end time of a traced operation"),
+    "chunks_embedded_total": ("counter", "Chunks embedded by a model (cache misses)"),
+    "embedding_cache_hits_total": ("counter", "Chunks served from the content-addressed embedding cache"),
+    "cache_hits_total": ("counter", "Hits of the in-memory query caches"),
+    "cache_misses_total": ("counter", "Misses of the in-memory query caches"),
+    "db_round_trips_total": ("counter", "Statements sent to the database"),
+    "bytes_read_total": ("counter", "Bytes read from uploaded files and from the database"),
+}
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Add `amount` to a counter (and to the active trace's counters)."""
+    if not amount:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    trace = _current_trace.get()
+    if trace is not None:
+        label = ",".join(f"{k}={v}" for k, v in key[1])
+        counter = f"{name}{{{label}}}" if label else name
+        trace.counters[counter] = trace.counters.get(counter, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    """Record one observation in a latency histogram."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[len(LATENCY_BUCKETS)] += 1
+        histogram[-1] += seconds
+
+
+class Trace:
+    """Per-request stage breakdown: exclusive milliseconds and calls per stage, plus counters."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.total = None
+
+    def add(self, stage, seconds):
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def breakdown(self):
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        staged = sum(seconds for seconds, _ in self.stages.values())
+        return {
+            "total_ms": round(total * 1000, 2),
+            "unattributed_ms": round(max(total - staged, 0.0) * 1000, 2),
+            "stages": {stage: {"ms": round(seconds * 1000, 2), "calls": calls}
+                       for stage, (seconds, calls) in sorted(self.stages.items(), key=lambda s: -s[1][0])},
+            "counters": dict(self.counters),
+        }
+
+
+@contextmanager
+def trace(name):
+    """
+    Collect the spans and counters of one operation (an /api/ask request, an
+    ingest). On exit each stage's total is recorded in the stage histogram and
+    the whole operation in the request histogram. Yields the Trace. Inside
+    another trace it yields that one, so nested operations are part of it.
+    """
+    active = _current_trace.get()
+    if active is not None:
+        yield active
+        return
+    current = Trace(name)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(None)
+    try:
+        yield current
+    finally:
+        current.total = time.perf_counter() - current.started
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        for stage, (seconds, _) in current.stages.items():
+            observe("stage_seconds", seconds, stage=stage)
+        observe("request_seconds", current.total, operation=name)
+
+
+@contextmanager
+def span(stage):
+    """
+    Time a stage. Time spent in spans nested inside it is charged to those
+    stages, so per-stage times add up to the request time. Outside a trace
+    each span is recorded in the stage histogram directly.
+    """
+    parent = _current_span.get()
+    frame = [stage, 0.0]  # stage, seconds spent in nested spans
+    token = _current_span.set(frame)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_span.reset(token)
+        if parent is not None:
+            parent[1] += elapsed
+        own = elapsed - frame[1]
+        current = _current_trace.get()
+        if current is not None:
+            current.add(stage, own)
+        else:
+            observe("stage_seconds", own, stage=stage)
+
+
+def timed_iter(iterable, stage):
+    """
+    Wrap a lazy pipeline stage (generator) so the time spent producing each
+    item is charged to `stage`. Consumer time between items is not counted.
+    """
+    iterator = iter(iterable)
+    while True:
+        with span(stage):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(value) for key, value in _histograms.items()}
+    lines = []
+    names = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+    for name in names:
+        kind, help_text = METRICS.get(name, ("counter" if name.endswith("_total") else "gauge", name))
+        full = f"{METRICS_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        if kind == "histogram":
+            for (hist_name, labels), values in sorted(histograms.items()):
+                if hist_name != name:
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS, values):
+                    lines.append(f"{full}_bucket{_labels(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{full}_bucket{_labels(labels + (('le', '+Inf'),))} {values[len(LATENCY_BUCKETS)]}")
+                lines.append(f"{full}_sum{_labels(labels)} {values[-1]:.6f}")
+                lines.append(f"{full}_count{_labels(labels)} {values[len(LATENCY_BUCKETS)]}")
+        else:
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{full}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Forget all recorded values."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,74 @@
+import argparse
+import json
+from backend.db import get_connection, ensure_embeddings_table, EMBEDDING_STORAGE
+from backend.vector_codec import encode_vector, FORMATS
+
+
+def migrate_embeddings(batch_size=1000, storage=EMBEDDING_STORAGE, keep_json=False):
+    """
+    Convert legacy JSON embeddings into the binary embedding_bin column.
+
+    Rows are processed in id order, `batch_size` at a time, with one commit
+    per batch, so the migration can be interrupted and re-run safely: rows
+    that already have embedding_bin are skipped.
+    Returns the number of rows converted.
+    """
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection for migrate_embeddings()")
+        return 0
+
+    converted = 0
+    last_id = 0
+    try:
+        cursor = conn.cursor()
+        ensure_embeddings_table(cursor)
+        conn.commit()
+
+        while True:
+            cursor.execute(
+                """
+                SELECT id, embedding FROM embeddings
+                WHERE id > %s AND embedding_bin IS NULL AND embedding IS NOT NULL
+                ORDER BY id LIMIT %s
+                """,
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, embedding_json in rows:
+                try:
+                    blob = encode_vector(json.loads(embedding_json), storage)
+                    updates.append((blob, row_id))
+                except Exception as e:
+                    print(f"⚠️ Skipping embedding {row_id}: {e}")
+            last_id = rows[-1][0]
+
+            if keep_json:
+                sql = "UPDATE embeddings SET embedding_bin = %s WHERE id = %s"
+            else:
+                sql = "UPDATE embeddings SET embedding_bin = %s, embedding = NULL WHERE id = %s"
+            cursor.executemany(sql, updates)
+            conn.commit()
+            converted += len(updates)
+            print(f"✅ Migrated {converted} embeddings (up to id {last_id})")
+
+        cursor.close()
+        print(f"✅ Migration complete: {converted} embeddings stored as {storage}")
+    except Exception as e:
+        print(f"❌ Embedding migration failed after {converted} rows: {e}")
+    finally:
+        conn.close()
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert JSON embeddings to binary storage.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--storage", choices=sorted(FORMATS), default=EMBEDDING_STORAGE)
+    parser.add_argument("--keep-json", action="store_true", help="Leave the legacy JSON column populated")
+    args = parser.parse_args()
+    migrate_embeddings(args.batch_size, args.storage, args.keep_json)
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import backend.config  # noqa: F401  (loads .env)
+from backend import metrics
+from backend.db import register_insert_listener, register_delete_listener
+
+# Size bounds (entries) and time-to-live (seconds) for each tier
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+QUERY_EMBED_CACHE_TTL = float(os.getenv("QUERY_EMBED_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Case/whitespace-insensitive form of a query, ignoring trailing punctuation."""
+    return _WHITESPACE.sub(" ", query).strip().rstrip("?!. ").lower()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    A named cache reports its hits and misses to backend/metrics.py.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    self._evict(key)
+                self.misses += 1
+                hit = False
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                hit = True
+        if self.name:
+            metrics.inc("cache_hits_total" if hit else "cache_misses_total", cache=self.name)
+        return entry[1] if hit else default
+
+    def peek(self, key, default=None):
+        """Return a live entry without touching LRU order or hit/miss counts."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= self._clock():
+                return default
+            return entry[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._evict(next(iter(self._data)))
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                self._evict(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self, key):
+        del self._data[key]
+
+
+class AnswerCache(TTLCache):
+    """
+    TTL/LRU cache of generated answers keyed on
+    (normalized query, retrieved chunk ids, model). It also remembers which
+    documents each answer drew from so they can be invalidated when those
+    documents change.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic, name=None):
+        super().__init__(maxsize, ttl, clock, name)
+        self._by_document = {}  # doc_id -> set of keys
+
+    @staticmethod
+    def make_key(query, chunk_ids, model_name):
+        return normalize_query(query), tuple(chunk_ids), model_name
+
+    def set_answer(self, key, answer, doc_ids):
+        self.set(key, (answer, frozenset(doc_ids)))
+        with self._lock:
+            if key in self._data:
+                for doc_id in doc_ids:
+                    self._by_document.setdefault(doc_id, set()).add(key)
+
+    def get_answer(self, key):
+        entry = self.get(key)
+        return entry[0] if entry is not None else None
+
+    def _evict(self, key):
+        _, (_, doc_ids) = self._data.pop(key)
+        for doc_id in doc_ids:
+            keys = self._by_document.get(doc_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_document[doc_id]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_document.clear()
+
+    def invalidate_documents(self, doc_ids):
+        """Drop every cached answer that used a chunk of any of `doc_ids`."""
+        dropped = 0
+        with self._lock:
+            for doc_id in set(doc_ids):
+                for key in list(self._by_document.get(doc_id, ())):
+                    if key in self._data:
+                        self._evict(key)
+                        dropped += 1
+        if dropped:
+            print(f"♻️ Invalidated {dropped} cached answer(s)")
+        return dropped
+
+
+query_embedding_cache = TTLCache(QUERY_EMBED_CACHE_SIZE, QUERY_EMBED_CACHE_TTL, name="query_embedding")
+answer_cache = AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, name="answer")
+
+
+def _on_insert(rows):
+    """db insert listener: chunks added to a document invalidate its answers."""
+    answer_cache.invalidate_documents({r[1] for r in rows})
+
+
+def _on_delete(doc_ids, chunk_ids=None):
+    """db delete listener: answers drawn from a deleted or updated document are stale."""
+    answer_cache.invalidate_documents(doc_ids)
+
+
+register_insert_listener(_on_insert)
+register_delete_listener(_on_delete)
@@ -1,35 +1,28 @@
-import os
-import json
-import mysql.connector
 import numpy as np
-from dotenv import load_dotenv
-import google.generativeai as genai
+from backend import metrics
 from backend.db import get_connection
-
-# ✅ Load environment variables
-load_dotenv()
-
-# ✅ Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from backend.retriever import get_retriever
+from backend.search_engine import embed_query, check_query_dim
+from backend.vector_codec import decode_row
+from backend.rag_engine import get_engine
 
 # ---------- Embedding Helper ----------
 def generate_query_embedding(query: str):
     """
-    Generate a vector embedding for the user query using Gemini.
+    Generate a vector embedding for the user query with the document embedding provider.
     """
     try:
-        model = "models/embedding-001"
-        response = genai.embed_content(model=model, content=query)
-        return np.array(response["embedding"], dtype=np.float32)
+        return embed_query(query)
     except Exception as e:
         print(f"❌ Error generating query embedding: {e}")
         return None
 
 
 # ---------- Search Helper ----------
-def fetch_all_embeddings():
+def fetch_all_embeddings(document_ids=None):
     """
-    Fetch all embeddings and their chunks from the MySQL database.
+    Fetch all embeddings and their chunks from the MySQL database,
+    optionally only those of `document_ids`.
     """
     conn = get_connection()
     if conn is None:
@@ -38,13 +31,17 @@ def fetch_all_embeddings():
 
     try:
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT document_id, chunk_index, text_chunk, embedding FROM embeddings")
+        sql = "SELECT document_id, chunk_index, text_chunk, embedding_bin, embedding FROM embeddings"
+        if document_ids:
+            sql += f" WHERE document_id IN ({', '.join(['%s'] * len(document_ids))})"
+        cursor.execute(sql, list(document_ids or []))
         rows = cursor.fetchall()
         cursor.close()
         conn.close()
 
-        for row in rows:
-            row["embedding"] = np.array(json.loads(row["embedding"]), dtype=np.float32)
+        with metrics.span("decode"):
+            for row in rows:
+                row["embedding"] = decode_row(row.pop("embedding_bin"), row["embedding"])
         return rows
     except Exception as e:
         print(f"❌ Error fetching embeddings: {e}")
@@ -56,23 +53,20 @@ def cosine_similarity(a, b):
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 
-def find_most_relevant_chunks(query_embedding, top_k=3):
+def find_most_relevant_chunks(query_embedding, top_k=3, document_ids=None):
     """
-    Find top_k chunks most similar to the query embedding.
+    Find top_k chunks most similar to the query embedding, optionally
+    scanning only the chunks of `document_ids`.
     """
-    rows = fetch_all_embeddings()
-    if not rows:
+    retriever = get_retriever()
+    if len(retriever) == 0:
         print("⚠️ No embeddings found in the database.")
         return []
 
-    similarities = []
-    for row in rows:
-        sim = cosine_similarity(query_embedding, row["embedding"])
-        similarities.append((sim, row["text_chunk"]))
-
-    similarities.sort(key=lambda x: x[0], reverse=True)
-    top_chunks = [chunk for _, chunk in similarities[:top_k]]
-    return top_chunks
+    check_query_dim(retriever, query_embedding)
+    rows = retriever.index.rows_for_documents(document_ids) if document_ids else None
+    with metrics.span("vector_search"):
+        return [chunk for _, _, chunk, _ in retriever.search(query_embedding, top_k=top_k, rows=rows)]
 
 
 # ---------- Answer Generation ----------
@@ -80,30 +74,4 @@ def generate_answer(query: str):
     """
     Generate a natural language answer using Gemini based on retrieved chunks.
     """
-    query_embedding = generate_query_embedding(query)
-    if query_embedding is None:
-        return "❌ Failed to generate embedding for query."
-
-    relevant_chunks = find_most_relevant_chunks(query_embedding)
-    if not relevant_chunks:
-        return "⚠️ No relevant data found in the database."
-
-    context = "\n\n".join(relevant_chunks)
-
-    prompt = f"""
-You are an intelligent assistant. Use the context below to answer the user query accurately.
-
-Context:
-{context}
-
-User Query:
-{query}
-
-Answer:
-    """
-
-    try:
-        response = genai.GenerativeModel("gemini-1.5-flash").generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        return f"❌ Gemini API error: {e}"
+    return get_engine().answer(query, top_k=3)
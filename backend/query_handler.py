@@ -1,46 +1,27 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-from backend.search_engine import search_similar_chunks
+from backend.rag_engine import get_engine, GENERATION_MODEL
 
-# ✅ Load .env variables
-load_dotenv()
 
-# ✅ Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+def get_model():
+    """Return the shared GenerativeModel, created on first use."""
+    return get_engine().model
 
 
-def generate_answer(query: str) -> str:
+def generate_answer(query: str, document_ids=None, source_type=None, uploaded_after=None) -> str:
     """
-    Uses Gemini to generate an answer from the database context.
+    Uses Gemini to generate an answer from the database context, optionally
+    restricted to some documents, a source type or recent uploads.
     """
-    # 1️⃣ Find relevant chunks
-    similar_chunks = search_similar_chunks(query, top_k=5)
+    return get_engine().answer(
+        query, top_k=5, document_ids=document_ids, source_type=source_type, uploaded_after=uploaded_after
+    )
 
-    if not similar_chunks:
-        return "⚠️ No relevant data found in the database."
 
-    # 2️⃣ Prepare context from retrieved chunks
-    context = "\n\n".join([chunk[2] for chunk in similar_chunks])
-
-    # 3️⃣ Send to Gemini
-    try:
-        prompt = f"""
-        You are a helpful assistant. Use the following document context to answer the user query.
-
-        Context:
-        {context}
-
-        User Query:
-        {query}
-
-        Provide a clear, accurate, and concise answer.
-        """
-
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
-
-        return response.text.strip()
-
-    except Exception as e:
-        return f"❌ Gemini error: {e}"
+def stream_answer(query: str, timings=None, document_ids=None, source_type=None, uploaded_after=None):
+    """
+    Like generate_answer, but yields the answer text as Gemini streams it.
+    `timings` (a dict) receives retrieval_ms, ttft_ms and total_ms.
+    """
+    return get_engine().stream_answer(
+        query, top_k=5, timings=timings,
+        document_ids=document_ids, source_type=source_type, uploaded_after=uploaded_after,
+    )
@@ -0,0 +1,265 @@
+import os
+import time
+import argparse
+import threading
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+from backend import metrics, registry
+from backend.retriever import get_retriever
+from backend.search_engine import search_similar_chunks, cached_query_embedding
+from backend.context_packing import pack_context
+from backend.chunking import count_tokens
+from backend.query_cache import answer_cache
+
+# Gemini model name, or "fake" for the local FakeStreamingModel
+GENERATION_MODEL = os.getenv("GENERATION_MODEL", "gemini-1.5-flash")
+# Chunks retrieved per question
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+
+NO_CONTEXT_ANSWER = "⚠️ No relevant data found in the database."
+
+PROMPT_TEMPLATE = """
+You are a helpful assistant. Use the following document context to answer the user query.
+
+Context:
+{context}
+
+User Query:
+{query}
+
+Provide a clear, accurate, and concise answer.
+"""
+
+
+class RAGEngine:
+    """
+    One retrieval-and-generation path for every caller.
+
+    The engine holds the long-lived pieces: the generative model client, the
+    resident retriever (vector + BM25 index) and the answer cache; query
+    embeddings are cached by search_engine.embed_query. Database access goes
+    through the shared connection pool in backend.db. `answer()` is the
+    synchronous entry point; `aanswer()` does the same work without blocking
+    an event loop, and `stream_answer()` yields the answer as it is generated.
+    """
+
+    def __init__(self, model_name=GENERATION_MODEL, top_k=RAG_TOP_K, retriever=None, model=None,
+                 answers=answer_cache):
+        self.model_name = model_name
+        self.top_k = top_k
+        self._retriever = retriever
+        self._model = model
+        self.answers = answers
+        self._lock = threading.Lock()
+
+    # ---------- long-lived clients ----------
+
+    @property
+    def model(self):
+        """The GenerativeModel, created (and the API key configured) on first use."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None and self.model_name == "fake":
+                    from backend.fake_models import FakeStreamingModel
+                    self._model = FakeStreamingModel()
+                elif self._model is None:
+                    self._model = registry.get("genai").GenerativeModel(self.model_name)
+        return self._model
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            self._retriever = get_retriever()
+        return self._retriever
+
+    # ---------- pipeline steps ----------
+
+    def retrieve(self, query, top_k=None, **filters):
+        """Return the (chunk_id, document_id, text_chunk, score) rows for a question."""
+        return search_similar_chunks(query, top_k=top_k or self.top_k, retriever=self.retriever, **filters)
+
+    def context(self, query, top_k=None, **filters):
+        """
+        Retrieve chunks for a question and pack them (similarity floor, MMR,
+        optional rerank, token budget). Returns (packed chunks, report); the
+        report carries chunk and prompt token counts before and after packing.
+        """
+        chunks = self.retrieve(query, top_k, **filters)
+        if not chunks:
+            return [], {}
+        query_vector = cached_query_embedding(query)
+        if query_vector is not None:
+            norm = np.linalg.norm(query_vector)
+            query_vector = query_vector / norm if norm else None
+        with metrics.span("context_packing"):
+            vectors = self.retriever.index.vectors_for([c[0] for c in chunks], [c[1] for c in chunks])
+            packed, report = pack_context(query, chunks, vectors, query_vector)
+            report["prompt_tokens_before"] = count_tokens(self.build_prompt(query, chunks))
+            report["prompt_tokens_after"] = count_tokens(self.build_prompt(query, packed))
+        print(f"📦 Context packed: {report['chunks_before']} → {report['chunks_after']} chunks, "
+              f"prompt {report['prompt_tokens_before']} → {report['prompt_tokens_after']} tokens")
+        return packed, report
+
+    def build_prompt(self, query, chunks):
+        context = "\n\n".join(chunk[2] for chunk in chunks)
+        return PROMPT_TEMPLATE.format(context=context, query=query)
+
+    def _cache_key(self, query, chunks):
+        return self.answers.make_key(query, [chunk[0] for chunk in chunks], self.model_name)
+
+    def _remember(self, key, answer, chunks):
+        self.answers.set_answer(key, answer, {chunk[1] for chunk in chunks})
+
+    def _cached(self, key):
+        cached = self.answers.get_answer(key)
+        if cached is not None:
+            print("✅ Answer cache hit")
+        return cached
+
+    # ---------- entry points ----------
+
+    def answer(self, query, top_k=None, **filters):
+        """
+        Answer a question from the knowledge base. `filters` are passed to
+        search_similar_chunks (document_ids, source_type, uploaded_after).
+        """
+        chunks, _ = self.context(query, top_k, **filters)
+        if not chunks:
+            return NO_CONTEXT_ANSWER
+
+        key = self._cache_key(query, chunks)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        try:
+            with metrics.span("generation"):
+                response = self.model.generate_content(self.build_prompt(query, chunks))
+                answer = response.text.strip()
+        except Exception as e:
+            return f"❌ Gemini error: {e}"
+        self._remember(key, answer, chunks)
+        return answer
+
+    async def aanswer(self, query, top_k=None, **filters):
+        """Async answer(): retrieval runs in a worker thread, generation uses the async client."""
+        import asyncio
+
+        chunks, _ = await asyncio.to_thread(self.context, query, top_k, **filters)
+        if not chunks:
+            return NO_CONTEXT_ANSWER
+
+        key = self._cache_key(query, chunks)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        prompt = self.build_prompt(query, chunks)
+        try:
+            with metrics.span("generation"):
+                if hasattr(self.model, "generate_content_async"):
+                    response = await self.model.generate_content_async(prompt)
+                else:
+                    response = await asyncio.to_thread(self.model.generate_content, prompt)
+                answer = response.text.strip()
+        except Exception as e:
+            return f"❌ Gemini error: {e}"
+        self._remember(key, answer, chunks)
+        return answer
+
+    def stream_answer(self, query, top_k=None, timings=None, use_cache=True, **filters):
+        """
+        Yield the answer in pieces as the model generates it.
+
+        `timings`, if given, is filled with retrieval_ms, ttft_ms (request
+        start to first answer text, the headline latency), total_ms and the
+        context packing report.
+        With use_cache=False the answer cache is neither read nor written.
+        """
+        timings = timings if timings is not None else {}
+        started = time.perf_counter()
+
+        def elapsed_ms():
+            return round((time.perf_counter() - started) * 1000, 1)
+
+        chunks, report = self.context(query, top_k, **filters)
+        timings.update(report)
+        timings["retrieval_ms"] = elapsed_ms()
+        if not chunks:
+            timings["ttft_ms"] = timings["total_ms"] = elapsed_ms()
+            yield NO_CONTEXT_ANSWER
+            return
+
+        key = self._cache_key(query, chunks)
+        cached = self._cached(key) if use_cache else None
+        if cached is not None:
+            timings["ttft_ms"] = timings["total_ms"] = elapsed_ms()
+            yield cached
+            return
+
+        pieces = []
+        try:
+            with metrics.span("generation"):
+                parts = self.model.generate_content(self.build_prompt(query, chunks), stream=True)
+            for part in metrics.timed_iter(parts, "generation"):
+                try:
+                    text = part.text
+                except ValueError:
+                    continue  # chunk without text parts (e.g. safety metadata only)
+                if not text:
+                    continue
+                if not pieces:
+                    timings["ttft_ms"] = elapsed_ms()
+                    print(f"⏱️ Time to first token: {timings['ttft_ms']} ms")
+                pieces.append(text)
+                yield text
+        except Exception as e:
+            timings.setdefault("ttft_ms", elapsed_ms())
+            timings["total_ms"] = elapsed_ms()
+            yield f"❌ Gemini error: {e}"
+            return
+
+        timings["total_ms"] = elapsed_ms()
+        answer = "".join(pieces).strip()
+        if answer and use_cache:
+            self._remember(key, answer, chunks)
+
+
+def measure_latency(engine, query, runs=3, **filters):
+    """
+    Stream `query` through the engine `runs` times and return the timings of
+    each run. The answer cache is bypassed so every run reaches the model.
+    """
+    results = []
+    for _ in range(runs):
+        timings = {}
+        for _ in engine.stream_answer(query, timings=timings, use_cache=False, **filters):
+            pass
+        results.append(timings)
+    return results
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide RAGEngine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RAGEngine()
+    return _engine
+
+
+if __name__ == "__main__":
+    # Measure time-to-first-token: python -m backend.rag_engine "question" [--fake]
+    parser = argparse.ArgumentParser(description="Measure streaming answer latency (TTFT).")
+    parser.add_argument("query")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--fake", action="store_true", help="Use the local FakeStreamingModel")
+    args = parser.parse_args()
+    engine = RAGEngine(model_name="fake") if args.fake else get_engine()
+    for run, timings in enumerate(measure_latency(engine, args.query, args.runs), start=1):
+        print(f"run {run}: {timings}")
@@ -0,0 +1,130 @@
+import os
+import time
+import threading
+import backend.config  # noqa: F401  (loads .env)
+
+# Comma-separated components to load by warm_up() when called without names,
+# e.g. WARMUP=retriever,genai,generator
+WARMUP = os.getenv("WARMUP", "")
+
+_loaders = {}
+_instances = {}
+_locks = {}  # name -> lock held while that component loads
+_lock = threading.RLock()
+_warm_up_thread = None
+
+
+def register(name):
+    """Decorator registering a zero-argument loader for a heavy component."""
+    def decorator(loader):
+        _loaders[name] = loader
+        return loader
+    return decorator
+
+
+def _lock_for(name):
+    with _lock:
+        lock = _locks.get(name)
+        if lock is None:
+            lock = _locks[name] = threading.RLock()
+        return lock
+
+
+def get(name):
+    """
+    Return a component, running its loader on first use only. Each
+    component loads under its own lock, so a slow load (e.g. a background
+    warm-up of Whisper) does not hold up the first use of another.
+    """
+    if name not in _instances:
+        with _lock_for(name):
+            if name not in _instances:
+                started = time.perf_counter()
+                _instances[name] = _loaders[name]()
+                print(f"✅ Loaded {name} in {time.perf_counter() - started:.2f}s")
+    return _instances[name]
+
+
+def is_loaded(name):
+    return name in _instances
+
+
+def warm_up(names=None):
+    """
+    Optional warm-up hook: load components ahead of the first request.
+    Defaults to the WARMUP list. Returns {name: seconds} (None on failure).
+    """
+    if names is None:
+        names = [n.strip() for n in WARMUP.split(",") if n.strip()]
+    timings = {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            get(name)
+            timings[name] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            print(f"⚠️ Warm-up of {name} failed: {e}")
+            timings[name] = None
+    return timings
+
+
+def start_warm_up(names=None):
+    """Run warm_up() once per process in a background thread (no-op if nothing is configured)."""
+    global _warm_up_thread
+    if _warm_up_thread is None and (names or WARMUP):
+        with _lock:
+            if _warm_up_thread is None:
+                _warm_up_thread = threading.Thread(target=warm_up, args=(names,), name="warm-up", daemon=True)
+                _warm_up_thread.start()
+    return _warm_up_thread
+
+
+# ---------- registered components ----------
+# Loaders import their module on call, so importing the registry stays cheap.
+
+@register("genai")
+def _load_genai():
+    """google.generativeai, configured with GEMINI_API_KEY (once per process)."""
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai
+
+
+@register("db")
+def _load_db_pool():
+    """MySQL connection pool, or the SQLite file with DB_BACKEND=sqlite (also bootstraps the schema)."""
+    from backend.db import DB_BACKEND, _get_pool
+    if DB_BACKEND == "sqlite":
+        from backend.sqlite_db import init_schema
+        return init_schema()
+    return _get_pool()
+
+
+@register("retriever")
+def _load_retriever():
+    from backend.retriever import get_retriever
+    return get_retriever()
+
+
+@register("generator")
+def _load_generator():
+    from backend.rag_engine import get_engine
+    return get_engine().model
+
+
+@register("whisper")
+def _load_whisper():
+    from backend.extract_audio import get_model
+    return get_model()
+
+
+@register("embedder")
+def _load_local_embedder():
+    from backend.generate_embeddings import document_provider
+    return document_provider().model
+
+
+@register("reranker")
+def _load_reranker():
+    from backend.context_packing import get_reranker
+    return get_reranker()
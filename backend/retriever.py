@@ -0,0 +1,439 @@
+import os
+import atexit
+import tempfile
+import threading
+import numpy as np
+import backend.config  # noqa: F401  (loads .env)
+from backend import metrics
+from backend.db import register_insert_listener, register_delete_listener
+from backend.vector_index import VectorIndex, load_index, prune_index
+from backend.keyword_index import KeywordIndex
+
+# "exact" (brute-force matrix product) or "ivf" (inverted file, approximate)
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "exact").lower()
+# Where the index is persisted between restarts ("" disables persistence)
+INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", os.path.join("index", "vectors.npz"))
+# IVF knobs: number of k-means lists (0 = ~4*sqrt(N)) and lists probed per query
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+# Retrain the IVF centroids once the live rows grow past this multiple of the training size
+IVF_RETRAIN_GROWTH = float(os.getenv("IVF_RETRAIN_GROWTH", "2.0"))
+
+
+class Retriever:
+    """
+    Common interface for vector retrieval backends.
+
+    Every backend stores its rows in a VectorIndex and returns search results
+    as (chunk_id, doc_id, text_chunk, score) tuples, best first. A BM25
+    KeywordIndex is kept row-aligned with the vector index for keyword and
+    hybrid search. Removing chunks tombstones their rows in place (see
+    VectorIndex), so neither index is rebuilt when a document changes.
+    """
+
+    name = "base"
+
+    def __init__(self, index=None, keywords=None):
+        self.index = index if index is not None else VectorIndex()
+        self._lock = threading.RLock()
+        if keywords is None or len(keywords) != len(self.index):
+            keywords = KeywordIndex()
+            keywords.add(self.index.texts)
+            deleted = np.flatnonzero(self.index.deleted)
+            keywords.remove(deleted, [""] * len(deleted))  # texts of removed rows are already blanked
+        self.keywords = keywords
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, ids, doc_ids, texts, vectors):
+        with self._lock:
+            start = len(self.index)
+            added = self.index.add(ids, doc_ids, texts, vectors)
+            self._index_keywords(start)
+            return added
+
+    def _index_keywords(self, start):
+        """Add the vector rows from `start` on to the keyword index (same row numbers)."""
+        if len(self.index) > start:
+            self.keywords.add(self.index.texts[start:])
+
+    def remove_documents(self, doc_ids):
+        """Drop every chunk of the given documents. Returns the number of rows removed."""
+        with self._lock:
+            return self.remove_rows(self.index.rows_for_documents(doc_ids))
+
+    def remove_chunks(self, chunk_ids):
+        """Drop the given chunks (embeddings.ids). Returns the number of rows removed."""
+        with self._lock:
+            return self.remove_rows(self.index.rows_for_ids(chunk_ids))
+
+    def remove_rows(self, rows):
+        """Drop the given row positions from both indexes. Returns the number of rows removed."""
+        with self._lock:
+            # The keyword index needs the texts, which VectorIndex.remove blanks
+            self.keywords.remove(rows, [self.index.texts[row] for row in rows])
+            return self.index.remove(rows)
+
+    def search(self, query_embedding, top_k=5, rows=None):
+        """Vector search; `rows` restricts scoring to those row positions."""
+        raise NotImplementedError
+
+    def keyword_search(self, query, top_k=5, rows=None):
+        """BM25 search over the chunk texts; needs no query embedding."""
+        index = self.index
+        hits = self.keywords.search(query, top_k=top_k, rows=rows)
+        return [(int(index.ids[row]), index.doc_ids[row], index.texts[row], score) for row, score in hits]
+
+    def to_arrays(self):
+        with self._lock:
+            arrays = self.index.to_arrays()
+            arrays.update(self.keywords.to_arrays(~self.index.deleted))
+        arrays["backend"] = np.array(self.name)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(VectorIndex.from_arrays(arrays), keywords=KeywordIndex.from_arrays(arrays))
+
+    def save(self, path):
+        """
+        Persist the retriever to a .npz file (written atomically). Each save
+        writes its own temp file, so processes saving at once cannot clobber
+        each other before the rename.
+        """
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False, suffix=".npz") as tmp:
+            try:
+                np.savez(tmp, **self.to_arrays())
+            except Exception:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, path)
+        print(f"✅ Saved {self.name} index ({self.index.live_count} chunks) to {path}")
+
+
+class ExactRetriever(Retriever):
+    """Brute-force cosine search over every row: exact, O(N) per query."""
+
+    name = "exact"
+
+    def search(self, query_embedding, top_k=5, rows=None):
+        return self.index.search(query_embedding, top_k=top_k, rows=rows)
+
+
+class IVFRetriever(Retriever):
+    """
+    Inverted-file approximate search.
+
+    Rows are clustered with spherical k-means into `nlist` lists; a query is
+    scored only against rows of its `nprobe` nearest centroids. Raising
+    `nprobe` trades speed for recall (nprobe == nlist is exact). Until enough
+    rows exist to train the centroids, searches fall back to exact scoring.
+    New rows are assigned to the existing centroids; once the corpus grows
+    past `retrain_growth` times the size it was trained on, the centroids
+    (and nlist) are retrained on a background thread so the lists stay
+    balanced without stalling the insert that crossed the threshold.
+    """
+
+    name = "ivf"
+
+    def __init__(self, index=None, nlist=IVF_NLIST, nprobe=IVF_NPROBE, n_iter=10,
+                 min_train_per_list=39, centroids=None, assign=None, keywords=None,
+                 retrain_growth=IVF_RETRAIN_GROWTH, trained_size=0):
+        super().__init__(index, keywords)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.min_train_per_list = min_train_per_list
+        self.retrain_growth = retrain_growth
+        self.centroids = centroids
+        self._trained_size = trained_size or (self.index.live_count if centroids is not None else 0)
+        self._assign = assign if assign is not None else np.empty(0, dtype=np.int32)
+        self._lists = None
+        self._training = False
+        if self.centroids is None:
+            self.train()
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def _target_nlist(self, n):
+        if self.nlist > 0:
+            return self.nlist
+        return max(1, int(4 * np.sqrt(n)))
+
+    def _can_train(self, n):
+        return n >= self._target_nlist(n) * self.min_train_per_list
+
+    def train(self, seed=0):
+        """
+        (Re)train the centroids on the current live rows and rebuild all
+        lists. k-means runs on a snapshot without holding the lock (stored
+        rows never change), so searches and inserts continue meanwhile; rows
+        added during training are assigned when the new centroids swap in.
+        """
+        with self._lock:
+            matrix = self.index.matrix
+            live = np.flatnonzero(~self.index.deleted)
+        n = len(live)
+        if not self._can_train(n):
+            return False
+        nlist = self._target_nlist(n)
+
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(live, size=min(n, nlist * 256), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assign = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty lists with random sample rows
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+        centroids = centroids.astype(np.float32)
+        assign = self._nearest(matrix, centroids)
+
+        with self._lock:
+            added = self._nearest(self.index.matrix[len(matrix):], centroids)
+            self.centroids = centroids
+            self._assign = np.concatenate((assign, added))
+            self._lists = None
+            self._trained_size = n
+        print(f"✅ Trained IVF index: {nlist} lists over {n} chunks")
+        return True
+
+    def _train_in_background(self):
+        """Start train() on a daemon thread unless one is already running."""
+        with self._lock:
+            if self._training:
+                return
+            self._training = True
+
+        def run():
+            try:
+                self.train()
+            except Exception as e:
+                print(f"⚠️ IVF training failed: {e}")
+            finally:
+                self._training = False
+
+        threading.Thread(target=run, name="ivf-train", daemon=True).start()
+
+    @staticmethod
+    def _nearest(vectors, centroids, batch=65536):
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch):
+            out[start:start + batch] = np.argmax(vectors[start:start + batch] @ centroids.T, axis=1)
+        return out
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            order = np.argsort(self._assign, kind="stable")
+            bounds = np.searchsorted(self._assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def add(self, ids, doc_ids, texts, vectors):
+        with self._lock:
+            start = len(self.index)
+            added = self.index.add(ids, doc_ids, texts, vectors)
+            if not added:
+                return 0
+            self._index_keywords(start)
+            if self.is_trained:
+                new_assign = self._nearest(self.index.matrix[start:], self.centroids)
+                self._assign = np.concatenate((self._assign, new_assign))
+                self._lists = None
+            live = self.index.live_count
+            grown = self.retrain_growth > 0 and live >= self.retrain_growth * self._trained_size
+            if (not self.is_trained or grown) and self._can_train(live):
+                self._train_in_background()
+            return added
+
+    def search(self, query_embedding, top_k=5, rows=None):
+        with self._lock:
+            nprobe = min(self.nprobe, len(self.centroids)) if self.is_trained else 0
+            # A filter smaller than the probed lists is cheaper to score exactly
+            if not self.is_trained or (rows is not None and len(rows) <= len(self.index) * nprobe / len(self.centroids)):
+                return self.index.search(query_embedding, top_k=top_k, rows=rows)
+            query = self.index.normalize_query(query_embedding)
+            if query is None:
+                return []
+            probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            lists = self._inverted_lists()
+            candidates = np.concatenate([lists[p] for p in probes])
+            if rows is not None:
+                candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            return self.index.search(query, top_k=top_k, rows=candidates)
+
+    def to_arrays(self):
+        with self._lock:
+            arrays = super().to_arrays()
+            if self.is_trained:
+                arrays["centroids"] = self.centroids
+                arrays["assign"] = self._assign[~self.index.deleted]
+                arrays["trained_size"] = np.array(self._trained_size)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        keywords = KeywordIndex.from_arrays(arrays)
+        if "centroids" in arrays:
+            return cls(
+                VectorIndex.from_arrays(arrays),
+                centroids=arrays["centroids"],
+                assign=arrays["assign"].astype(np.int32),
+                keywords=keywords,
+                trained_size=int(arrays.get("trained_size", 0)),
+            )
+        return cls(VectorIndex.from_arrays(arrays), keywords=keywords)
+
+
+BACKENDS = {
+    ExactRetriever.name: ExactRetriever,
+    IVFRetriever.name: IVFRetriever,
+}
+
+
+def load_retriever(path, backend=RETRIEVER_BACKEND):
+    """Load a persisted retriever, or return None if missing/incompatible."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+        if str(arrays.get("backend")) != backend:
+            print(f"⚠️ Persisted index at {path} is not a '{backend}' index; rebuilding.")
+            return None
+        retriever = BACKENDS[backend].from_arrays(arrays)
+        print(f"✅ Loaded {backend} index from {path} ({len(retriever)} chunks)")
+        return retriever
+    except Exception as e:
+        print(f"⚠️ Failed to load persisted index {path}: {e}")
+        return None
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+# Listener events that arrive while get_retriever() is loading, replayed once it is done
+_pending = None
+_pending_lock = threading.Lock()
+
+
+def _defer(event):
+    """Queue a listener event if the retriever is still loading. Returns True if queued."""
+    if _retriever is not None:
+        return False
+    with _pending_lock:
+        if _retriever is None and _pending is not None:
+            _pending.append(event)
+            return True
+    return False
+
+
+def _apply_insert(retriever, rows, skip_known=False):
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    keep = ~np.isin(ids, retriever.index.ids) if skip_known else np.ones(len(rows), dtype=bool)
+    rows = [r for r, k in zip(rows, keep) if k]
+    if rows:
+        retriever.add(
+            [r[0] for r in rows],
+            [r[1] for r in rows],
+            [r[2] for r in rows],
+            [r[3] for r in rows],
+        )
+
+
+def _apply_delete(retriever, doc_ids, chunk_ids=None):
+    if chunk_ids is None:
+        retriever.remove_documents(doc_ids)
+    else:
+        retriever.remove_chunks(chunk_ids)
+
+
+def _on_insert(rows):
+    """db insert listener: keep the resident retriever current."""
+    if _defer(("insert", rows)) or _retriever is None:
+        return
+    with metrics.span("index_update"):
+        _apply_insert(_retriever, rows)
+
+
+def _on_delete(doc_ids, chunk_ids=None):
+    """db delete listener: tombstone removed chunks (or whole documents) in the resident retriever."""
+    if _defer(("delete", doc_ids, chunk_ids)) or _retriever is None:
+        return
+    with metrics.span("index_update"):
+        _apply_delete(_retriever, doc_ids, chunk_ids)
+
+
+def save_retriever(path=INDEX_PATH):
+    """Persist the process-wide retriever (no-op if never loaded)."""
+    if _retriever is not None and path:
+        try:
+            _retriever.save(path)
+        except Exception as e:
+            print(f"⚠️ Failed to save index to {path}: {e}")
+
+
+def get_retriever():
+    """
+    Return the process-wide retriever. On first use it is restored from
+    INDEX_PATH when available: rows deleted since the save are dropped and
+    only rows added since are read from MySQL. Otherwise it is built from
+    the full embeddings table. The db listeners are registered before the
+    load; inserts and deletes committed while it runs are queued and
+    replayed on top of it, so none are missed.
+    """
+    global _retriever, _pending
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                if RETRIEVER_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown RETRIEVER_BACKEND: {RETRIEVER_BACKEND}")
+                with _pending_lock:
+                    _pending = []
+                register_insert_listener(_on_insert)
+                register_delete_listener(_on_delete)
+                try:
+                    with metrics.span("index_load"):
+                        retriever = load_retriever(INDEX_PATH)
+                        pruned = 0
+                        if retriever is None:
+                            retriever = BACKENDS[RETRIEVER_BACKEND]()
+                        else:
+                            pruned = prune_index(retriever.index, remove=retriever.remove_rows)
+                        before = len(retriever)
+                        delta = load_index(VectorIndex(dim=retriever.index.dim), min_id=retriever.index.max_id)
+                        if len(delta):
+                            retriever.add(delta.ids, delta.doc_ids, delta.texts, delta.matrix)
+                    with _pending_lock:
+                        # The load may already hold rows whose insert event was queued
+                        for kind, *args in _pending:
+                            if kind == "insert":
+                                _apply_insert(retriever, *args, skip_known=True)
+                            else:
+                                _apply_delete(retriever, *args)
+                        _retriever = retriever
+                finally:
+                    with _pending_lock:
+                        _pending = None
+                if INDEX_PATH:
+                    if pruned or len(retriever) != before:
+                        save_retriever(INDEX_PATH)
+                    atexit.register(save_retriever, INDEX_PATH)
+    return _retriever
+
+
+if __name__ == "__main__":
+    # Rebuild the persisted index from MySQL: python -m backend.retriever
+    rebuilt = BACKENDS[RETRIEVER_BACKEND](load_index())
+    if INDEX_PATH:
+        rebuilt.save(INDEX_PATH)
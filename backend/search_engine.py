@@ -1,19 +1,21 @@
 import os
+import re
 import numpy as np
-import json
-import mysql.connector
-from dotenv import load_dotenv
-import google.generativeai as genai
-from backend.db import get_connection
+import backend.config  # noqa: F401  (loads .env)
+from backend import metrics
+from backend.db import find_document_ids
+from backend.generate_embeddings import document_provider
+from backend.retriever import get_retriever
+from backend.query_cache import query_embedding_cache
 
-# ✅ Load environment variables
-load_dotenv()
+# "hybrid" (BM25 + vector, fused), "vector" or "keyword"
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid").lower()
+# Candidates taken from each ranking before fusion, and the RRF damping constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
 
-# ✅ Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-# Use Gemini embedding model
-EMBED_MODEL = "models/embedding-001"
+# A query token that looks like an identifier: has a digit or an inner - . / : _
+_IDENTIFIER = re.compile(r"^(?=.*\d)\w+$|^\w+(?:[-./:_]\w+)+$")
 
 
 def cosine_similarity(a, b):
@@ -22,46 +24,150 @@ def cosine_similarity(a, b):
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 
-def search_similar_chunks(query, top_k=5):
+class EmbeddingMismatchError(ValueError):
+    """The query embedding does not have the dimension of the indexed chunks."""
+
+
+def _query_key(query):
+    provider = document_provider()
+    return provider.name, provider.cache_model, query.strip()
+
+
+def cached_query_embedding(query):
+    """The query embedding if it is already cached, else None (never calls the API)."""
+    return query_embedding_cache.peek(_query_key(query))
+
+
+def embed_query(query):
+    """
+    Return the query embedding, served from the LRU/TTL query cache when the
+    same text was embedded recently. Queries are embedded by the same
+    provider as the document chunks (generate_embeddings.document_provider),
+    so both live in one vector space.
+    """
+    key = _query_key(query)
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        with metrics.span("query_embedding"):
+            embedding = np.asarray(document_provider().embed_query(query), dtype=np.float32)
+        query_embedding_cache.set(key, embedding)
+    return embedding
+
+
+def check_query_dim(retriever, query_embedding):
+    """Raise EmbeddingMismatchError unless the query matches the index dimension."""
+    dim = np.asarray(query_embedding).size
+    if retriever.index.dim is not None and dim != retriever.index.dim:
+        raise EmbeddingMismatchError(
+            f"Query embedding has dimension {dim} but the index holds {retriever.index.dim}-d chunks; "
+            f"the index was built with a different embedding model (rebuild it: python -m backend.retriever)"
+        )
+
+
+def is_identifier_query(query):
+    """True when every word of the query looks like a code, part number or version."""
+    tokens = [t.strip(".,;:!?\"'()") for t in query.split()]
+    return bool(tokens) and all(_IDENTIFIER.match(t) for t in tokens if t)
+
+
+def reciprocal_rank_fusion(rankings, top_k=5, k=RRF_K):
     """
-    Search MySQL for chunks most similar to the query.
+    Fuse several ranked lists of (chunk_id, document_id, text_chunk, score)
+    by reciprocal rank: each list contributes 1 / (k + rank) per chunk.
+    Returns the top_k rows with the fused score.
     """
-    conn = get_connection()
-    if conn is None:
-        print("❌ No DB connection in search_similar_chunks()")
+    fused, rows = {}, {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row[0]] = fused.get(row[0], 0.0) + 1.0 / (k + rank)
+            rows.setdefault(row[0], row)
+    best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [(chunk_id, rows[chunk_id][1], rows[chunk_id][2], fused[chunk_id]) for chunk_id in best]
+
+
+def filter_rows(retriever, document_ids=None, source_type=None, uploaded_after=None):
+    """
+    Resolve search filters to the retriever rows they allow, or None when no
+    filter is set. Document metadata filters are answered by the indexed
+    documents table; document ids map straight to their rows.
+    """
+    if not (document_ids or source_type or uploaded_after):
+        return None
+    with metrics.span("filter"):
+        if source_type or uploaded_after:
+            document_ids = find_document_ids(document_ids, source_type, uploaded_after)
+        return retriever.index.rows_for_documents(document_ids or [])
+
+
+def keyword_search(query, top_k=5, **filters):
+    """BM25 keyword search; answers without calling the embedding API."""
+    retriever = get_retriever()
+    return retriever.keyword_search(query, top_k=top_k, rows=filter_rows(retriever, **filters))
+
+
+def search_similar_chunks(query, top_k=5, mode=None, document_ids=None, source_type=None, uploaded_after=None,
+                          retriever=None):
+    """
+    Search the configured retriever for chunks most relevant to the query.
+
+    In hybrid mode the BM25 and vector rankings are merged with reciprocal
+    rank fusion. Queries made only of identifiers (error codes, part
+    numbers) with keyword hits take the keyword-only fast path and skip the
+    embedding call; keyword hits are also returned if embedding fails.
+
+    `document_ids`, `source_type` ("text", "audio", "video", "image") and
+    `uploaded_after` restrict the search; they are applied before scoring,
+    so only the matching documents' chunks are scanned. `retriever` defaults
+    to the process-wide one.
+    Returns a list of (chunk_id, document_id, text_chunk, score). Raises
+    EmbeddingMismatchError if the index was built with another embedding model.
+    """
+    mode = (mode or SEARCH_MODE).lower()
+    if retriever is None:
+        retriever = get_retriever()
+    if len(retriever) == 0:
+        print("⚠️ No embeddings found in database.")
         return []
 
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, document_id, text_chunk, embedding FROM embeddings")
-        results = cursor.fetchall()
-
-        if not results:
-            print("⚠️ No embeddings found in database.")
+        rows = filter_rows(retriever, document_ids, source_type, uploaded_after)
+        if rows is not None and len(rows) == 0:
+            print("⚠️ No chunks match the search filters.")
             return []
 
-        # 1️⃣ Embed the query
-        query_embedding = genai.embed_content(model=EMBED_MODEL, content=query)['embedding']
+        if mode == "vector":
+            query_embedding = embed_query(query)
+            check_query_dim(retriever, query_embedding)
+            with metrics.span("vector_search"):
+                return retriever.search(query_embedding, top_k=top_k, rows=rows)
+
+        # 1️⃣ Keyword ranking (local, no API call)
+        depth = max(top_k, HYBRID_CANDIDATES)
+        with metrics.span("keyword_search"):
+            keyword_hits = retriever.keyword_search(query, top_k=depth, rows=rows)
+        if mode == "keyword" or (keyword_hits and is_identifier_query(query)):
+            return keyword_hits[:top_k]
 
-        # 2️⃣ Compute similarity for each chunk
-        similarities = []
-        for row in results:
-            chunk_id, doc_id, text_chunk, embedding_json = row
-            try:
-                embedding = json.loads(embedding_json)
-                score = cosine_similarity(query_embedding, embedding)
-                similarities.append((chunk_id, doc_id, text_chunk, score))
-            except Exception as e:
-                print(f"⚠️ Error computing similarity for chunk {chunk_id}: {e}")
+        # 2️⃣ Vector ranking (all chunks, or the probed IVF lists)
+        try:
+            query_embedding = embed_query(query)
+        except Exception as e:
+            print(f"⚠️ Query embedding failed, using keyword results only: {e}")
+            return keyword_hits[:top_k]
+        check_query_dim(retriever, query_embedding)
+        try:
+            with metrics.span("vector_search"):
+                vector_hits = retriever.search(query_embedding, top_k=depth, rows=rows)
+        except Exception as e:
+            print(f"⚠️ Vector search failed, using keyword results only: {e}")
+            return keyword_hits[:top_k]
 
-        # 3️⃣ Sort by similarity score (descending)
-        similarities.sort(key=lambda x: x[3], reverse=True)
-        return similarities[:top_k]
+        # 3️⃣ Fuse the two rankings
+        with metrics.span("fusion"):
+            return reciprocal_rank_fusion([vector_hits, keyword_hits], top_k=top_k)
 
+    except EmbeddingMismatchError:
+        raise
     except Exception as e:
         print(f"❌ Search failed: {e}")
         return []
-
-    finally:
-        cursor.close()
-        conn.close()
@@ -0,0 +1,174 @@
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+import backend.config  # noqa: F401  (loads .env)
+from backend.db import DOCUMENT_COLUMNS, DOCUMENT_INDEXES
+
+# Database file used when DB_BACKEND=sqlite
+SQLITE_PATH = os.getenv("SQLITE_PATH", "multimodal.sqlite3")
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+# MySQL-only SQL used by backend/db.py, rewritten for SQLite
+_REWRITES = [
+    ("INSERT IGNORE", "INSERT OR IGNORE"),
+    ("CONCAT(COALESCE(content, ''), %s)", "COALESCE(content, '') || %s"),
+    ("CONCAT(COALESCE(pending_content, ''), %s)", "COALESCE(pending_content, '') || %s"),
+    ("SUBSTRING(", "SUBSTR("),
+]
+_PLACEHOLDER = re.compile(r"%s")
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        doc_id TEXT,
+        content TEXT,
+        file_hash TEXT NULL,
+        filename TEXT NULL,
+        mime_type TEXT NULL,
+        size_bytes INTEGER NULL,
+        source_type TEXT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        source_path TEXT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP NULL,
+        pending_content TEXT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS embeddings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        document_id TEXT,
+        chunk_index INTEGER,
+        text_chunk TEXT,
+        embedding TEXT NULL,
+        embedding_bin BLOB NULL,
+        source_unit TEXT NULL,
+        source_start REAL NULL,
+        source_end REAL NULL,
+        token_count INTEGER NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_embeddings_document ON embeddings (document_id)",
+    """
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT,
+        task_type TEXT,
+        embedding_bin BLOB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+INDEXES = [f"CREATE INDEX IF NOT EXISTS {name} ON documents ({columns})" for name, columns in DOCUMENT_INDEXES]
+
+
+@lru_cache(maxsize=256)
+def translate(sql):
+    """Rewrite a MySQL statement from backend/db.py into SQLite syntax."""
+    for mysql_sql, sqlite_sql in _REWRITES:
+        sql = sql.replace(mysql_sql, sqlite_sql)
+    return _PLACEHOLDER.sub("?", sql)
+
+
+class SQLiteCursor:
+    """The subset of the mysql-connector cursor API used by backend/db.py."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(translate(sql), rows)
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    A SQLite connection that looks like a pooled mysql-connector one, so the
+    functions in backend/db.py run unchanged against a local file.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._conn.close()
+
+
+def init_schema(path=None):
+    """Create the tables and indexes in the SQLite file (once per process). Returns the path."""
+    path = path or SQLITE_PATH
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                conn = sqlite3.connect(path, timeout=30)
+                try:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                    # Upgrade files created before the newer document columns
+                    existing = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+                    for column, definition in DOCUMENT_COLUMNS:
+                        if column not in existing:
+                            conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {definition}")
+                    for statement in INDEXES:
+                        conn.execute(statement)
+                    conn.commit()
+                finally:
+                    conn.close()
+                _initialized.add(path)
+                print(f"✅ Using SQLite database: {path}")
+    return path
+
+
+def get_connection(path=None):
+    """Open a connection to the SQLite database, creating the schema on first use."""
+    try:
+        return SQLiteConnection(init_schema(path))
+    except sqlite3.Error as e:
+        print(f"❌ Error opening SQLite database: {e}")
+        return None
@@ -1,11 +1,83 @@
 import os
 import uuid
-import fitz  # PyMuPDF for PDF
-import docx
-from pptx import Presentation
-from backend.extract_audio import extract_from_audio, extract_from_video
-from backend.db import insert_document
-from backend.generate_embeddings import create_embeddings  # ✅ NEW: for Gemini embeddings
+import mimetypes
+from backend import metrics
+from backend.extract_audio import iter_audio_segments, iter_video_segments
+from backend.extract_text import iter_pdf_pages, iter_docx_paragraphs, iter_pptx_slides, iter_txt_blocks
+from backend.extract_image import extract_from_image
+from backend.db import (
+    insert_document, find_document_by_hash, append_document_content, set_document_hash,
+    get_document, iter_document_chunks, stage_document_content, update_document_chunks,
+    delete_document,
+)
+from backend.embedding_cache import file_hash, chunk_hash
+from backend.generate_embeddings import create_embeddings, chunk_text, document_provider  # ✅ NEW: for Gemini embeddings
+from backend.chunking import report_progress
+
+# Characters of extracted text returned to the caller for previews
+PREVIEW_CHARS = 3000
+# Extracted text is appended to documents.content in windows of this size
+CONTENT_WINDOW_CHARS = 4 * 1024 * 1024
+
+# documents.source_type per file extension (used by filtered search)
+SOURCE_TYPES = {
+    ".txt": "text", ".md": "text", ".pdf": "text", ".docx": "text", ".pptx": "text",
+    ".mp3": "audio", ".wav": "audio",
+    ".mp4": "video", ".mov": "video", ".avi": "video",
+    ".png": "image", ".jpg": "image", ".jpeg": "image",
+}
+
+
+def document_metadata(file_path: str):
+    """Filename, MIME type, size, source type and source path recorded with a document."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return {
+        "filename": os.path.basename(file_path),
+        "mime_type": mimetypes.guess_type(file_path)[0],
+        "size_bytes": os.path.getsize(file_path),
+        "source_type": SOURCE_TYPES.get(ext),
+        "source_path": os.path.abspath(file_path),
+    }
+
+
+def iter_text_from_file(file_path: str):
+    """
+    Stream text out of a supported file as (text, meta) segments: one per PDF
+    page, DOCX paragraph, PPTX slide, block of text lines or audio/video
+    transcript segment. Images yield a single segment.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    # 📝 Plain Text
+    if ext == ".txt":
+        yield from iter_txt_blocks(file_path)
+
+    # 📘 PDF
+    elif ext == ".pdf":
+        yield from iter_pdf_pages(file_path)
+
+    # 📄 Word Document
+    elif ext == ".docx":
+        yield from iter_docx_paragraphs(file_path)
+
+    # 📊 PowerPoint
+    elif ext == ".pptx":
+        yield from iter_pptx_slides(file_path)
+
+    # 🎵 Audio (timestamped transcript segments)
+    elif ext in [".mp3", ".wav"]:
+        yield from iter_audio_segments(file_path)
+
+    # 🎥 Video (audio track decoded in memory)
+    elif ext in [".mp4", ".mov", ".avi"]:
+        yield from iter_video_segments(file_path)
+
+    # 🖼️ Image (Tesseract OCR)
+    elif ext in [".png", ".jpg", ".jpeg"]:
+        yield extract_from_image(file_path), {}
+
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
 
 
 def extract_text_from_file(file_path: str) -> str:
@@ -13,53 +85,10 @@ def extract_text_from_file(file_path: str) -> str:
     Extract text from multiple supported file types:
     txt, pdf, docx, pptx, mp3, wav, mp4, mov, avi, png, jpg, jpeg
     """
-    ext = os.path.splitext(file_path)[1].lower()
-    text = ""
-
     print(f"📂 Extracting from file: {file_path}")
 
     try:
-        # 📝 Plain Text
-        if ext == ".txt":
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
-
-        # 📘 PDF
-        elif ext == ".pdf":
-            doc = fitz.open(file_path)
-            for page in doc:
-                text += page.get_text("text")
-            doc.close()
-
-        # 📄 Word Document
-        elif ext == ".docx":
-            doc = docx.Document(file_path)
-            text = "\n".join([para.text for para in doc.paragraphs])
-
-        # 📊 PowerPoint
-        elif ext == ".pptx":
-            prs = Presentation(file_path)
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-
-        # 🎵 Audio
-        elif ext in [".mp3", ".wav"]:
-            text = extract_from_audio(file_path)
-
-        # 🎥 Video
-        elif ext in [".mp4", ".mov", ".avi"]:
-            text = extract_from_video(file_path)
-
-        # 🖼️ Image (OCR placeholder)
-        elif ext in [".png", ".jpg", ".jpeg"]:
-            text = "[Image uploaded — OCR not implemented yet.]"
-
-        else:
-            print(f"❌ Unsupported file type: {ext}")
-            return None
-
+        text = "\n".join(segment for segment, _ in iter_text_from_file(file_path))
     except Exception as e:
         print(f"❌ Error during extraction from {file_path}: {e}")
         return None
@@ -73,27 +102,230 @@ def extract_text_from_file(file_path: str) -> str:
     return text
 
 
-def process_and_store(file_path: str):
+class _ContentWriter:
+    """
+    Passes segments through unchanged while appending their text to the
+    document row (or its staged next version) in bounded windows, and
+    keeping a short preview.
+    """
+
+    def __init__(self, doc_id, segments, progress=None, staged=False):
+        self.doc_id = doc_id
+        self.segments = segments
+        self.progress = progress
+        self.staged = staged
+        self.segment_count = 0
+        self.preview = ""
+        self.chars = 0
+        self._window = []
+        self._window_chars = 0
+
+    def __iter__(self):
+        for text, meta in self.segments:
+            if len(self.preview) < PREVIEW_CHARS:
+                self.preview = (self.preview + text + "\n")[:PREVIEW_CHARS]
+            self.chars += len(text)
+            self._window.append(text + "\n")
+            self._window_chars += len(text) + 1
+            if self._window_chars >= CONTENT_WINDOW_CHARS:
+                self.flush()
+            self.segment_count += 1
+            if self.progress:
+                self.progress("extracting", extracted=self.segment_count)
+            yield text, meta
+        self.flush()
+
+    def flush(self):
+        if self._window:
+            append_document_content(self.doc_id, "".join(self._window), staged=self.staged)
+            self._window, self._window_chars = [], 0
+
+
+def process_and_store(file_path: str, progress=None):
     """
     Extracts text, stores it in MySQL, and creates embeddings.
-    Returns: (doc_id, text)
+
+    Extraction, chunking, embedding and storage run as one streaming
+    pipeline, so peak memory depends on the embedding batch size rather than
+    on the document size. A file whose bytes were already ingested returns
+    the existing document; every other upload creates a new document (new
+    versions go through update_document). `progress(stage, **counts)` is
+    called as segments are extracted, chunked, embedded and stored. Each
+    stage is timed as part of an "ingest" trace (backend/metrics.py).
+    Returns: (doc_id, text preview)
     """
-    text = extract_text_from_file(file_path)
-    if not text:
+    with metrics.trace("ingest"):
+        return _process_and_store(file_path, progress)
+
+
+def _process_and_store(file_path, progress=None):
+    try:
+        with metrics.span("hash"):
+            content_hash = file_hash(file_path)
+        metrics.inc("bytes_read_total", os.path.getsize(file_path), source="file")
+        existing = find_document_by_hash(content_hash, preview_chars=PREVIEW_CHARS)
+    except OSError as e:
+        print(f"❌ Could not read {file_path}: {e}")
+        return None, None
+    if existing:
+        print(f"✅ Duplicate upload, reusing document (ID: {existing[0]})")
+        return existing[0], existing[1]
+
+    print(f"📂 Extracting from file: {file_path}")
+    try:
+        segments = metrics.timed_iter(iter_text_from_file(file_path), "extract")
+        # Hold back the document row until there is some text to store
+        first = next((s for s in segments if s[0].strip()), None)
+    except Exception as e:
+        print(f"❌ Error during extraction from {file_path}: {e}")
+        return None, None
+    if first is None:
+        print("⚠️ No readable text extracted.")
         return None, None
 
     doc_id = str(uuid.uuid4())
 
+    def all_segments():
+        yield first
+        yield from segments
+
     try:
-        # ✅ Insert document
-        insert_document(doc_id, text)
+        # ✅ Insert document, then stream its content alongside the embeddings
+        insert_document(doc_id, "", metadata=document_metadata(file_path))
         print(f"✅ Document stored successfully (ID: {doc_id})")
 
         # ✅ Create embeddings for Gemini
-        create_embeddings(doc_id, text)
+        writer = _ContentWriter(doc_id, all_segments(), progress)
+        inserted = create_embeddings(doc_id, writer, progress=progress)
+        print(f"✅ Extraction successful ({writer.chars} chars)")
+        if not inserted:
+            # Don't leave a document row (and its partial content) without chunks behind
+            delete_document(doc_id)
+            return None, None
+
+        # ✅ Only a fully ingested document is eligible for upload dedup
+        set_document_hash(doc_id, content_hash)
+        if progress:
+            progress("stored", embedded=inserted, total=inserted)
 
-        return doc_id, text
+        return doc_id, writer.preview.strip()
 
     except Exception as e:
         print(f"❌ Database insert or embedding creation failed: {e}")
+        delete_document(doc_id)
+        return None, None
+
+
+class _ChunkDiff:
+    """
+    Matches a new version's chunks against the stored ones by normalized
+    hash (duplicates pair up in order). fresh() passes on only the new or
+    edited chunks; once it is exhausted, changes() lists the unchanged
+    chunks whose position moved and the stored chunks that are gone.
+    """
+
+    def __init__(self, stored):
+        self.stored = stored  # chunk hash -> [(id, (chunk_index, source_unit, source_start, source_end))]
+        self.moved = []
+        self.unchanged = 0
+        self.total = 0
+
+    def fresh(self, chunks):
+        for chunk_index, (chunk, meta) in enumerate(chunks):
+            self.total += 1
+            matches = self.stored.get(chunk_hash(chunk))
+            if not matches:
+                yield chunk_index, chunk, meta
+                continue
+            row_id, position = matches.pop(0)
+            self.unchanged += 1
+            if position != (chunk_index, meta.get("source_unit"), meta.get("source_start"), meta.get("source_end")):
+                self.moved.append((row_id, chunk_index, meta))
+
+    def changes(self):
+        return self.moved, [row_id for rows in self.stored.values() for row_id, _ in rows]
+
+
+def update_document(doc_id: str, file_path: str, progress=None):
+    """
+    Re-ingest `file_path` as a new version of an existing document.
+
+    The new text streams through the same pipeline as process_and_store
+    (content appended in windows, chunks embedded in batches), and each
+    chunk is matched by its normalized hash against the chunks already
+    stored: unchanged chunks keep their rows and vectors (only their
+    position is updated), removed ones are deleted, and only new or edited
+    chunks are embedded. The retriever and answer cache follow through the
+    db listeners, without an index rebuild.
+    Returns: (doc_id, text preview), or (None, None) on failure.
+    """
+    with metrics.trace("update"):
+        return _update_document(doc_id, file_path, progress)
+
+
+def _update_document(doc_id, file_path, progress=None):
+    document = get_document(doc_id, preview_chars=PREVIEW_CHARS)
+    if document is None:
+        print(f"❌ No document with ID {doc_id}")
+        return None, None
+    try:
+        with metrics.span("hash"):
+            content_hash = file_hash(file_path)
+        metrics.inc("bytes_read_total", os.path.getsize(file_path), source="file")
+        metadata = document_metadata(file_path)
+    except OSError as e:
+        print(f"❌ Could not read {file_path}: {e}")
+        return None, None
+    if content_hash == document["file_hash"]:
+        print(f"✅ File unchanged, keeping version {document['version']} of document (ID: {doc_id})")
+        return doc_id, (document["preview"] or "").strip()
+
+    print(f"📂 Extracting from file: {file_path}")
+    try:
+        segments = metrics.timed_iter(iter_text_from_file(file_path), "extract")
+        first = next((s for s in segments if s[0].strip()), None)
+    except Exception as e:
+        print(f"❌ Error during extraction from {file_path}: {e}")
+        return None, None
+    if first is None:
+        print("⚠️ No readable text extracted.")
+        return None, None
+
+    def all_segments():
+        yield first
+        yield from segments
+
+    try:
+        # Only ids and positions of the stored chunks are kept, not their text
+        stored = {}
+        for row in iter_document_chunks(doc_id):
+            stored.setdefault(chunk_hash(row[2]), []).append((row[0], (row[1], *row[3:6])))
+        diff = _ChunkDiff(stored)
+
+        # The new text is staged and only replaces the content when the chunks commit
+        stage_document_content(doc_id)
+        writer = _ContentWriter(doc_id, all_segments(), progress, staged=True)
+        chunks = metrics.timed_iter(chunk_text(writer), "chunk")
+        if progress:
+            chunks = report_progress(chunks, progress, "chunking", "chunked")
+        provider = document_provider()
+        rows = metrics.timed_iter(provider.embed_chunks(diff.fresh(chunks)), "embed")
+        if progress:
+            rows = report_progress(rows, progress, "embedding", "embedded")
+        with metrics.span("store_embeddings"):
+            version = update_document_chunks(doc_id, rows, diff.changes, content_hash, metadata)
+        if version is None:
+            stage_document_content(doc_id, discard=True)
+            return None, None
+        _, removed = diff.changes()
+        embedded = diff.total - diff.unchanged
+        print(f"✅ Document {doc_id} updated to version {version}: {diff.unchanged} chunk(s) unchanged, "
+              f"{embedded} embedded, {len(removed)} removed")
+        if progress:
+            progress("stored", unchanged=diff.unchanged, embedded=embedded, removed=len(removed), total=diff.total)
+        return doc_id, writer.preview.strip()
+
+    except Exception as e:
+        print(f"❌ Document update failed: {e}")
+        stage_document_content(doc_id, discard=True)
         return None, None
@@ -0,0 +1,63 @@
+import json
+import struct
+import numpy as np
+
+# Binary layout of embeddings.embedding_bin (all little-endian):
+#   byte 0      format code (see FORMATS)
+#   bytes 1-3   reserved (keeps the payload 4-byte aligned)
+#   bytes 4-7   float32 scale (int8 only; 1.0 otherwise)
+#   bytes 8-    vector payload
+HEADER = struct.Struct("<B3xf")
+
+FORMATS = {
+    "float32": (1, np.dtype("<f4")),
+    "float16": (2, np.dtype("<f2")),
+    "int8": (3, np.dtype("i1")),
+}
+_BY_CODE = {code: (name, dtype) for name, (code, dtype) in FORMATS.items()}
+
+
+def encode_vector(vector, storage="float32"):
+    """
+    Encode an embedding as compact bytes for the embedding_bin column.
+    `storage` is one of "float32", "float16" or "int8" (symmetric
+    quantization with a per-vector scale).
+    """
+    if storage not in FORMATS:
+        raise ValueError(f"Unknown embedding storage format: {storage}")
+    code, dtype = FORMATS[storage]
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+
+    scale = 1.0
+    if storage == "int8":
+        peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        payload = np.clip(np.rint(vector / scale), -127, 127).astype(dtype)
+    else:
+        payload = vector.astype(dtype)
+    return HEADER.pack(code, scale) + payload.tobytes()
+
+
+def decode_vector(blob):
+    """
+    Decode bytes written by encode_vector. float32 vectors are returned as a
+    read-only view over `blob` (no copy); other formats are widened to float32.
+    """
+    code, scale = HEADER.unpack_from(blob)
+    if code not in _BY_CODE:
+        raise ValueError(f"Unknown embedding format code: {code}")
+    name, dtype = _BY_CODE[code]
+    vector = np.frombuffer(blob, dtype=dtype, offset=HEADER.size)
+    if name == "float32":
+        return vector
+    vector = vector.astype(np.float32)
+    if name == "int8":
+        vector *= scale
+    return vector
+
+
+def decode_row(embedding_bin, embedding_json):
+    """Decode an embeddings row, preferring the binary column over legacy JSON."""
+    if embedding_bin is not None:
+        return decode_vector(embedding_bin)
+    return np.array(json.loads(embedding_json), dtype=np.float32)
@@ -0,0 +1,343 @@
+import threading
+from array import array
+import numpy as np
+from backend.db import get_connection
+from backend.vector_codec import decode_row
+
+
+class VectorIndex:
+    """
+    Resident in-memory index over the embeddings table.
+
+    Vectors are L2-normalized float32 rows of one contiguous matrix, with
+    parallel arrays for the row id, document id and text chunk. A query is
+    scored with a single matrix-vector product. Row positions are also
+    grouped by document, so a search can be restricted to some documents
+    without scanning the rest.
+
+    Removed rows are tombstoned rather than shifted: they stay in the matrix
+    but are masked out of every search, so row positions (and the keyword
+    index aligned with them) never move while the process runs. to_arrays()
+    writes only the live rows.
+    """
+
+    def __init__(self, dim=None, capacity=1024):
+        self.dim = dim
+        self._capacity = capacity
+        self._size = 0
+        self._matrix = None
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._deleted_count = 0
+        self.doc_ids = []
+        self.texts = []
+        self._doc_rows = {}  # doc_id -> array of row positions
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def matrix(self):
+        """Live view of the stored (normalized) vectors."""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    @property
+    def ids(self):
+        return self._ids[:self._size]
+
+    @property
+    def deleted(self):
+        """Boolean mask of removed (tombstoned) rows."""
+        return self._deleted[:self._size]
+
+    @property
+    def live_count(self):
+        return self._size - self._deleted_count
+
+    def _grow(self, needed):
+        """Double the backing arrays until `needed` rows fit (amortized O(1) append)."""
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity and self._matrix is not None:
+            return
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        ids = np.empty(capacity, dtype=np.int64)
+        deleted = np.zeros(capacity, dtype=bool)
+        if self._matrix is not None:
+            matrix[:self._size] = self._matrix[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+            deleted[:self._size] = self._deleted[:self._size]
+        self._matrix, self._ids, self._deleted, self._capacity = matrix, ids, deleted, capacity
+
+    def add(self, ids, doc_ids, texts, vectors):
+        """
+        Append rows to the index. Vectors whose dimension does not match the
+        index are skipped, mirroring the per-row error handling of the old scan.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if len(vectors) == 0:
+            return 0
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                print(f"⚠️ Skipping {len(vectors)} vector(s) of dim {vectors.shape[1]} (index dim is {self.dim})")
+                return 0
+
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+
+            start, end = self._size, self._size + len(vectors)
+            self._grow(end)
+            np.divide(vectors, norms, out=self._matrix[start:end])
+            self._ids[start:end] = ids
+            self.doc_ids.extend(doc_ids)
+            self.texts.extend(texts)
+            self._index_documents(start)
+            self._size = end
+            return len(vectors)
+
+    def _index_documents(self, start):
+        for row in range(start, len(self.doc_ids)):
+            rows = self._doc_rows.get(self.doc_ids[row])
+            if rows is None:
+                rows = self._doc_rows[self.doc_ids[row]] = array("q")
+            rows.append(row)
+
+    def rows_for_documents(self, doc_ids):
+        """Sorted row positions of the given documents' chunks."""
+        with self._lock:
+            parts = [np.array(self._doc_rows[d], dtype=np.int64) for d in set(doc_ids) if d in self._doc_rows]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
+
+    def rows_for_ids(self, chunk_ids):
+        """Row positions of the given embeddings.ids that are still live."""
+        with self._lock:
+            rows = np.nonzero(np.isin(self._ids[:self._size], np.asarray(list(chunk_ids), dtype=np.int64)))[0]
+            return rows[~self._deleted[rows]]
+
+    def remove(self, rows):
+        """Tombstone the given row positions. Returns the number of rows removed."""
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        with self._lock:
+            rows = rows[rows < self._size]
+            rows = rows[~self._deleted[rows]]
+            if len(rows) == 0:
+                return 0
+            self._deleted[rows] = True
+            self._deleted_count += len(rows)
+            removed = set(rows.tolist())
+            for doc_id in {self.doc_ids[row] for row in removed}:
+                kept = array("q", (row for row in self._doc_rows[doc_id] if row not in removed))
+                if kept:
+                    self._doc_rows[doc_id] = kept
+                else:
+                    del self._doc_rows[doc_id]
+            for row in removed:
+                self.texts[row] = ""
+            return len(rows)
+
+    def vectors_for(self, chunk_ids, doc_ids):
+        """Stored unit vectors of the given chunks (None for chunks not in the index)."""
+        vectors = []
+        with self._lock:
+            for chunk_id, doc_id in zip(chunk_ids, doc_ids):
+                rows = np.array(self._doc_rows.get(doc_id, ()), dtype=np.int64)
+                match = rows[self._ids[rows] == chunk_id] if len(rows) else rows
+                vectors.append(self._matrix[match[0]].copy() if len(match) else None)
+        return vectors
+
+    @property
+    def max_id(self):
+        """Highest embeddings.id held by the index (0 when empty)."""
+        return int(self._ids[:self._size].max()) if self._size else 0
+
+    def normalize_query(self, query_embedding):
+        """Return the query as a unit float32 vector, or None if unusable."""
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        if query.shape[0] != self.dim:
+            print(f"⚠️ Query dim {query.shape[0]} does not match index dim {self.dim}")
+            return None
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        return query / norm
+
+    def search(self, query_embedding, top_k=5, rows=None):
+        """
+        Return the top_k rows as (chunk_id, doc_id, text_chunk, score),
+        sorted by cosine similarity (descending). `rows` optionally restricts
+        scoring to a subset of row positions.
+        """
+        with self._lock:
+            n = self._size
+            if n == 0 or top_k <= 0:
+                return []
+            query = self.normalize_query(query_embedding)
+            if query is None:
+                return []
+
+            if rows is None:
+                scores = self._matrix[:n] @ query
+                if self._deleted_count:
+                    scores[self._deleted[:n]] = -np.inf
+                live = n - self._deleted_count
+            else:
+                rows = np.asarray(rows, dtype=np.int64)
+                if self._deleted_count:
+                    rows = rows[~self._deleted[rows]]
+                if len(rows) == 0:
+                    return []
+                scores = self._matrix[rows] @ query
+                live = len(rows)
+
+            k = min(top_k, live)
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            positions = top if rows is None else rows[top]
+            return [
+                (int(self._ids[p]), self.doc_ids[p], self.texts[p], float(scores[t]))
+                for t, p in zip(top, positions)
+            ]
+
+    def to_arrays(self):
+        """Serialize the live rows into a dict of NumPy arrays (see from_arrays)."""
+        with self._lock:
+            keep = ~self.deleted
+            doc_ids = [d for d, live in zip(self.doc_ids, keep) if live]
+            texts = [t for t, live in zip(self.texts, keep) if live]
+            doc_blob, doc_offsets = _pack_strings(doc_ids)
+            text_blob, text_offsets = _pack_strings(texts)
+            return {
+                "matrix": self.matrix[keep],
+                "ids": self.ids[keep],
+                "doc_blob": doc_blob,
+                "doc_offsets": doc_offsets,
+                "text_blob": text_blob,
+                "text_offsets": text_offsets,
+            }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild an index from the arrays written by to_arrays()."""
+        matrix = arrays["matrix"]
+        index = cls(dim=matrix.shape[1] if len(matrix) else None, capacity=max(len(matrix), 1024))
+        if len(matrix):
+            index._grow(len(matrix))
+            index._matrix[:len(matrix)] = matrix
+            index._ids[:len(matrix)] = arrays["ids"]
+            index.doc_ids = _unpack_strings(arrays["doc_blob"], arrays["doc_offsets"])
+            index.texts = _unpack_strings(arrays["text_blob"], arrays["text_offsets"])
+            index._index_documents(0)
+            index._size = len(matrix)
+        return index
+
+
+def _pack_strings(values):
+    """Encode a list of strings as one UTF-8 byte array plus end offsets."""
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob, offsets):
+    data = blob.tobytes()
+    starts = np.concatenate(([0], offsets[:-1])) if len(offsets) else []
+    return [data[a:b].decode("utf-8") for a, b in zip(starts, offsets)]
+
+
+def load_index(index=None, min_id=0):
+    """
+    Load rows of the embeddings table into `index` (a fresh VectorIndex by
+    default). Only rows with id > min_id are read, so a persisted index can
+    catch up on rows inserted since it was saved.
+    """
+    if index is None:
+        index = VectorIndex()
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection in load_index()")
+        return index
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, document_id, text_chunk, embedding_bin, embedding FROM embeddings "
+            "WHERE id > %s ORDER BY id",
+            (int(min_id),)
+        )
+        loaded = 0
+        while True:
+            batch = cursor.fetchmany(5000)
+            if not batch:
+                break
+            ids, doc_ids, texts, vectors = [], [], [], []
+            for chunk_id, doc_id, text_chunk, embedding_bin, embedding_json in batch:
+                try:
+                    vectors.append(decode_row(embedding_bin, embedding_json))
+                except Exception as e:
+                    print(f"⚠️ Error decoding embedding for chunk {chunk_id}: {e}")
+                    continue
+                ids.append(chunk_id)
+                doc_ids.append(doc_id)
+                texts.append(text_chunk)
+            # Group by dimension so a stray vector doesn't reject the whole batch
+            if vectors and len({len(v) for v in vectors}) == 1:
+                loaded += index.add(ids, doc_ids, texts, vectors)
+            else:
+                for row in zip(ids, doc_ids, texts, vectors):
+                    loaded += index.add([row[0]], [row[1]], [row[2]], [row[3]])
+        cursor.close()
+        print(f"✅ Loaded {loaded} chunk(s) into the vector index ({len(index)} total)")
+    except Exception as e:
+        print(f"❌ Failed to load vector index: {e}")
+    finally:
+        conn.close()
+    return index
+
+
+def prune_index(index, remove=None):
+    """
+    Tombstone rows of `index` whose ids are no longer in the embeddings
+    table, i.e. chunks deleted after the index was saved or by another
+    process. `remove(rows)` does the tombstoning (default index.remove).
+    Returns the number of rows removed.
+    """
+    if index.live_count == 0:
+        return 0
+    conn = get_connection()
+    if conn is None:
+        print("❌ No DB connection in prune_index()")
+        return 0
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM embeddings WHERE id <= %s", (index.max_id,))
+        live = []
+        while True:
+            batch = cursor.fetchmany(50000)
+            if not batch:
+                break
+            live.extend(row[0] for row in batch)
+        cursor.close()
+    except Exception as e:
+        print(f"❌ Failed to check the vector index against the database: {e}")
+        return 0
+    finally:
+        conn.close()
+
+    removed = (remove or index.remove)(np.nonzero(~np.isin(index.ids, np.array(live, dtype=np.int64)))[0])
+    if removed:
+        print(f"🗑️ Dropped {removed} deleted chunk(s) from the persisted index")
+    return removed